@@ -1,796 +1,2065 @@
 import streamlit as st
 import sqlite3
 import hashlib
-from datetime import datetime, time
+import functools
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
 import os
+import queue
 import re
+import tempfile
+import threading
 from PIL import Image
 import io
+import csv
+import json
+import numpy as np
 import pandas as pd
 
 # --------------------------
 # Database Functions
 # --------------------------
 
+DB_PATH = "data/requests.db"
+DB_POOL_SIZE = 8
+
+# Applied once to every connection when it is opened, not per query.
+DB_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=268435456",
+)
+
+def _open_db_connection():
+    """Open a new connection with the tuned pragmas applied."""
+    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+    # Pooled connections are handed between Streamlit script threads, but
+    # only ever used by one borrower at a time.
+    conn = sqlite3.connect(DB_PATH, timeout=5, check_same_thread=False)
+    for pragma in DB_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+@st.cache_resource
+def _get_db_pool():
+    """Process-wide pool of idle connections, shared across reruns and sessions."""
+    return queue.LifoQueue(maxsize=DB_POOL_SIZE)
+
+@contextmanager
 def get_db_connection():
-    """Create and return a database connection."""
-    os.makedirs("data", exist_ok=True)
-    return sqlite3.connect("data/requests.db")
+    """Borrow a pooled database connection for the duration of a with block.
+
+    Any transaction left open (e.g. after an exception) is rolled back before
+    the connection goes back to the pool.
+    """
+    pool = _get_db_pool()
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = _open_db_connection()
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+# --------------------------
+# Read Caching
+# --------------------------
+
+# Upper bound on cached read results kept in memory; least recently used
+# entries are evicted first. The bound counts entries, not bytes, so
+# readers of BLOB columns (HOLD images) stay uncached.
+READ_CACHE_MAX_ENTRIES = 256
+
+@st.cache_resource
+def _get_data_versions():
+    """Process-wide {table: version} map and the lock guarding it."""
+    return {}, threading.Lock()
+
+def data_version(*tables):
+    versions, _ = _get_data_versions()
+    return tuple(versions.get(table, 0) for table in tables)
+
+def bump_data_version(*tables):
+    """Invalidate cached reads of `tables`. Call after the write has committed."""
+    versions, lock = _get_data_versions()
+    with lock:
+        for table in tables:
+            versions[table] = versions.get(table, 0) + 1
+
+@st.cache_data(max_entries=READ_CACHE_MAX_ENTRIES, show_spinner=False)
+def _cached_read(name, version, args, kwargs, _func):
+    return _func(*args, **dict(kwargs))
+
+def cached_read(*tables):
+    """Serve a reader from the shared cache until one of `tables` is written.
+
+    Results are shared by every session in this process and keyed on the
+    reader's arguments plus the data versions of `tables`, which the writers
+    bump. Versions live in process memory, so writes made by another process
+    are not seen until this one writes the same table or restarts.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return _cached_read(func.__name__, data_version(*tables), args,
+                                tuple(sorted(kwargs.items())), func)
+        return wrapper
+    return decorator
+
+def now_timestamps():
+    """Current time as (display text, epoch seconds) taken from one instant."""
+    now = datetime.now()
+    return now.strftime("%Y-%m-%d %H:%M:%S"), int(now.timestamp())
+
+# Low-cardinality text columns that read_frame() stores as pandas categoricals.
+CATEGORICAL_COLUMNS = {
+    "request_type", "reason", "issue_type", "product", "role", "agent_name",
+}
+
+def read_frame(query, params=()):
+    """Run `query` into a typed DataFrame without building per-row Python objects.
+
+    Columns named in CATEGORICAL_COLUMNS become categoricals and the TEXT
+    `timestamp` column is parsed to datetime64 in one vectorized pass.
+    """
+    with get_db_connection() as conn:
+        df = pd.read_sql_query(query, conn, params=params)
+    for column in CATEGORICAL_COLUMNS.intersection(df.columns):
+        df[column] = df[column].astype("category")
+    if "timestamp" in df.columns:
+        df["timestamp"] = pd.to_datetime(df["timestamp"], format="%Y-%m-%d %H:%M:%S", errors="coerce")
+    return df
 
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
 def authenticate(username, password):
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         hashed_password = hash_password(password)
         cursor.execute("SELECT role FROM users WHERE LOWER(username) = LOWER(?) AND password = ?", 
                       (username, hashed_password))
         result = cursor.fetchone()
         return result[0] if result else None
-    finally:
-        conn.close()
 
-def init_db():
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        
-        # Create tables if they don't exist
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE,
-                password TEXT,
-                role TEXT CHECK(role IN ('agent', 'admin')))
-        """)
-        
+def _migration_1_base_schema(cursor):
+    """Baseline tables, settings row and seed accounts."""
+    # Create tables if they don't exist
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE,
+            password TEXT,
+            role TEXT CHECK(role IN ('agent', 'admin')))
+    """)
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS requests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            agent_name TEXT,
+            request_type TEXT,
+            identifier TEXT,
+            comment TEXT,
+            timestamp TEXT,
+            completed INTEGER DEFAULT 0)
+    """)
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS mistakes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            team_leader TEXT,
+            agent_name TEXT,
+            ticket_id TEXT,
+            error_description TEXT,
+            timestamp TEXT)
+    """)
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS group_messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sender TEXT,
+            message TEXT,
+            timestamp TEXT,
+            mentions TEXT)
+    """)
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS hold_images (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            uploader TEXT,
+            image_data BLOB,
+            timestamp TEXT)
+    """)
+    
+    # Handle system_settings table schema migration
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='system_settings'")
+    if not cursor.fetchone():
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS requests (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                agent_name TEXT,
-                request_type TEXT,
-                identifier TEXT,
-                comment TEXT,
-                timestamp TEXT,
-                completed INTEGER DEFAULT 0)
+            CREATE TABLE system_settings (
+                id INTEGER PRIMARY KEY DEFAULT 1,
+                killswitch_enabled INTEGER DEFAULT 0,
+                chat_killswitch_enabled INTEGER DEFAULT 0)
         """)
-        
+        cursor.execute("INSERT INTO system_settings (id, killswitch_enabled, chat_killswitch_enabled) VALUES (1, 0, 0)")
+    else:
+        cursor.execute("PRAGMA table_info(system_settings)")
+        columns = [column[1] for column in cursor.fetchall()]
+        if 'chat_killswitch_enabled' not in columns:
+            cursor.execute("ALTER TABLE system_settings ADD COLUMN chat_killswitch_enabled INTEGER DEFAULT 0")
+            cursor.execute("UPDATE system_settings SET chat_killswitch_enabled = 0 WHERE id = 1")
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS breaks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            break_name TEXT,
+            start_time TEXT,
+            end_time TEXT,
+            max_users INTEGER,
+            current_users INTEGER DEFAULT 0,
+            created_by TEXT,
+            timestamp TEXT)
+    """)
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS break_bookings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            break_id INTEGER,
+            user_id INTEGER,
+            username TEXT,
+            booking_date TEXT,
+            timestamp TEXT,
+            FOREIGN KEY(break_id) REFERENCES breaks(id))
+    """)
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS request_comments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            request_id INTEGER,
+            user TEXT,
+            comment TEXT,
+            timestamp TEXT,
+            FOREIGN KEY(request_id) REFERENCES requests(id))
+    """)
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS _logins (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            agent_name TEXT,
+            presence_time TEXT,
+            login_time TEXT,
+            reason TEXT,
+            timestamp TEXT)
+    """)
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS quality_issues (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            agent_name TEXT,
+            issue_type TEXT,
+            timing TEXT,
+            mobile_number TEXT,
+            product TEXT,
+            timestamp TEXT)
+    """)
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS midshift_issues (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            agent_name TEXT,
+            issue_type TEXT,
+            start_time TEXT,
+            end_time TEXT,
+            timestamp TEXT)
+    """)
+    
+    # Create default admin account
+    cursor.execute("""
+        INSERT OR IGNORE INTO users (username, password, role) 
+        VALUES (?, ?, ?)
+    """, ("taha kirri", hash_password("arise@99"), "admin"))
+    admin_accounts = [
+        ("taha kirri", "arise@99"),
+        ("admin", "Admin@3356"),
+    ]
+    
+    for username, password in admin_accounts:
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS mistakes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                team_leader TEXT,
-                agent_name TEXT,
-                ticket_id TEXT,
-                error_description TEXT,
-                timestamp TEXT)
-        """)
-        
+            INSERT OR IGNORE INTO users (username, password, role) 
+            VALUES (?, ?, ?)
+        """, (username, hash_password(password), "admin"))
+    
+    # Create agent accounts (agent name as username, workspace ID as password)
+    agents = [
+        ("agent", "Agent@123"),
+    ]
+    
+    for agent_name, workspace_id in agents:
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS group_messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                sender TEXT,
-                message TEXT,
-                timestamp TEXT,
-                mentions TEXT)
+            INSERT OR IGNORE INTO users (username, password, role) 
+            VALUES (?, ?, ?)
+        """, (agent_name, hash_password(workspace_id), "agent"))
+
+def _migration_2_indexes(cursor):
+    """Secondary indexes for the feed, comment, booking and login lookups."""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_username_lower ON users(LOWER(username))")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_requests_timestamp ON requests(timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_request_comments_request ON request_comments(request_id, timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_mistakes_timestamp ON mistakes(timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_group_messages_timestamp ON group_messages(timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_hold_images_timestamp ON hold_images(timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_breaks_start_time ON breaks(start_time)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_break_bookings_date ON break_bookings(booking_date, break_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_break_bookings_user_date ON break_bookings(username, booking_date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_logins_timestamp ON _logins(timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_quality_issues_timestamp ON quality_issues(timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_midshift_issues_timestamp ON midshift_issues(timestamp)")
+
+def _migration_3_requests_keyset_index(cursor):
+    """Composite index backing keyset pagination of the request feed."""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_requests_timestamp_id ON requests(timestamp, id)")
+    cursor.execute("DROP INDEX IF EXISTS idx_requests_timestamp")
+
+# Columns mirrored into each full-text index, keyed by source table.
+FTS_COLUMNS = {
+    "requests": ("agent_name", "request_type", "identifier", "comment"),
+    "mistakes": ("agent_name", "ticket_id", "error_description"),
+}
+
+def _create_fts_index(cursor, table, columns):
+    """External-content FTS5 table over `table`, kept in sync by triggers."""
+    fts = f"{table}_fts"
+    cols = ", ".join(columns)
+    new_cols = ", ".join(f"new.{c}" for c in columns)
+    old_cols = ", ".join(f"old.{c}" for c in columns)
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            {cols}, content='{table}', content_rowid='id', prefix='2 3')
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts} (rowid, {cols}) VALUES (new.id, {new_cols});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+            INSERT INTO {fts} (rowid, {cols}) VALUES (new.id, {new_cols});
+        END
+    """)
+    cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+def _migration_4_full_text_search(cursor):
+    """FTS5 indexes for request and mistake search, if this SQLite has FTS5."""
+    try:
+        cursor.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+        cursor.execute("DROP TABLE temp.fts5_probe")
+    except sqlite3.OperationalError:
+        # Searches fall back to LIKE scans; see fts_available().
+        return
+    for table, columns in FTS_COLUMNS.items():
+        _create_fts_index(cursor, table, columns)
+
+def _migration_5_counters(cursor):
+    """Trigger-maintained row counters so notifications never count whole tables."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0)
+    """)
+    bump = """
+        INSERT INTO counters (name, value) VALUES ({name}, {delta})
+        ON CONFLICT(name) DO UPDATE SET value = value + excluded.value;
+    """
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS counters_requests_ai AFTER INSERT ON requests BEGIN
+            {bump.format(name="'requests'", delta="1")}
+            {bump.format(name="'requests_pending'", delta="(IFNULL(new.completed, 0) = 0)")}
+            {bump.format(name="'requests_type:' || IFNULL(new.request_type, '')", delta="1")}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS counters_requests_ad AFTER DELETE ON requests BEGIN
+            {bump.format(name="'requests'", delta="-1")}
+            {bump.format(name="'requests_pending'", delta="-(IFNULL(old.completed, 0) = 0)")}
+            {bump.format(name="'requests_type:' || IFNULL(old.request_type, '')", delta="-1")}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS counters_requests_au AFTER UPDATE OF completed, request_type ON requests BEGIN
+            {bump.format(name="'requests_pending'", delta="(IFNULL(new.completed, 0) = 0) - (IFNULL(old.completed, 0) = 0)")}
+            {bump.format(name="'requests_type:' || IFNULL(old.request_type, '')", delta="-1")}
+            {bump.format(name="'requests_type:' || IFNULL(new.request_type, '')", delta="1")}
+        END
+    """)
+    for table in ("mistakes", "group_messages"):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS counters_{table}_ai AFTER INSERT ON {table} BEGIN
+                {bump.format(name=f"'{table}'", delta="1")}
+            END
         """)
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS hold_images (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                uploader TEXT,
-                image_data BLOB,
-                timestamp TEXT)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS counters_{table}_ad AFTER DELETE ON {table} BEGIN
+                {bump.format(name=f"'{table}'", delta="-1")}
+            END
         """)
-        
-        # Handle system_settings table schema migration
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='system_settings'")
-        if not cursor.fetchone():
-            cursor.execute("""
-                CREATE TABLE system_settings (
-                    id INTEGER PRIMARY KEY DEFAULT 1,
-                    killswitch_enabled INTEGER DEFAULT 0,
-                    chat_killswitch_enabled INTEGER DEFAULT 0)
+    rebuild_counters(cursor)
+
+def rebuild_counters(cursor):
+    """Recompute every counter from the source tables."""
+    cursor.execute("DELETE FROM counters")
+    cursor.execute("INSERT INTO counters (name, value) SELECT 'requests', COUNT(*) FROM requests")
+    cursor.execute("""
+        INSERT INTO counters (name, value)
+        SELECT 'requests_pending', COUNT(*) FROM requests WHERE IFNULL(completed, 0) = 0
+    """)
+    cursor.execute("""
+        INSERT INTO counters (name, value)
+        SELECT 'requests_type:' || IFNULL(request_type, ''), COUNT(*) FROM requests GROUP BY 1
+    """)
+    cursor.execute("INSERT INTO counters (name, value) SELECT 'mistakes', COUNT(*) FROM mistakes")
+    cursor.execute("INSERT INTO counters (name, value) SELECT 'group_messages', COUNT(*) FROM group_messages")
+
+# Row shape returned for each table, matching the original column order
+# (the epoch created_at column is left out).
+TABLE_COLUMNS = {
+    "requests": "id, agent_name, request_type, identifier, comment, timestamp, completed",
+    "request_comments": "id, request_id, user, comment, timestamp",
+    "mistakes": "id, team_leader, agent_name, ticket_id, error_description, timestamp",
+    "group_messages": "id, sender, message, timestamp, mentions",
+}
+
+# Tables whose inserts and updates are published through change_log.
+CHANGE_FEED_TABLES = ("requests", "mistakes", "group_messages", "request_comments")
+CHANGE_LOG_RETENTION = 10000
+
+def _migration_6_change_log(cursor):
+    """Append-only change log feeding get_changes_since()."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS change_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            op TEXT NOT NULL)
+    """)
+    for table in CHANGE_FEED_TABLES:
+        for op in ("insert", "update"):
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS change_log_{table}_{op} AFTER {op.upper()} ON {table} BEGIN
+                    INSERT INTO change_log (table_name, row_id, op) VALUES ('{table}', new.id, '{op}');
+                END
             """)
-            cursor.execute("INSERT INTO system_settings (id, killswitch_enabled, chat_killswitch_enabled) VALUES (1, 0, 0)")
-        else:
-            cursor.execute("PRAGMA table_info(system_settings)")
-            columns = [column[1] for column in cursor.fetchall()]
-            if 'chat_killswitch_enabled' not in columns:
-                cursor.execute("ALTER TABLE system_settings ADD COLUMN chat_killswitch_enabled INTEGER DEFAULT 0")
-                cursor.execute("UPDATE system_settings SET chat_killswitch_enabled = 0 WHERE id = 1")
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS breaks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                break_name TEXT,
-                start_time TEXT,
-                end_time TEXT,
-                max_users INTEGER,
-                current_users INTEGER DEFAULT 0,
-                created_by TEXT,
-                timestamp TEXT)
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS break_bookings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                break_id INTEGER,
-                user_id INTEGER,
-                username TEXT,
-                booking_date TEXT,
-                timestamp TEXT,
-                FOREIGN KEY(break_id) REFERENCES breaks(id))
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS request_comments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                request_id INTEGER,
-                user TEXT,
-                comment TEXT,
-                timestamp TEXT,
-                FOREIGN KEY(request_id) REFERENCES requests(id))
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS _logins (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                agent_name TEXT,
-                presence_time TEXT,
-                login_time TEXT,
-                reason TEXT,
-                timestamp TEXT)
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS quality_issues (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                agent_name TEXT,
-                issue_type TEXT,
-                timing TEXT,
-                mobile_number TEXT,
-                product TEXT,
-                timestamp TEXT)
+    # Keep the log bounded; readers that fall further behind simply miss
+    # the oldest entries.
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS change_log_retention AFTER INSERT ON change_log BEGIN
+            DELETE FROM change_log WHERE id <= new.id - {CHANGE_LOG_RETENTION};
+        END
+    """)
+
+# Every table with a TEXT timestamp gets an integer epoch twin, created_at.
+EPOCH_TABLES = (
+    "requests", "request_comments", "mistakes", "group_messages", "hold_images",
+    "breaks", "break_bookings", "_logins", "quality_issues", "midshift_issues",
+)
+EPOCH_BACKFILL_BATCH = 5000
+
+def _migration_7_epoch_timestamps(cursor):
+    """Integer created_at columns and indexes that replace the TEXT timestamp ones."""
+    for table in EPOCH_TABLES:
+        cursor.execute(f"PRAGMA table_info({table})")
+        if "created_at" not in [column[1] for column in cursor.fetchall()]:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN created_at INTEGER")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_requests_created_id ON requests(created_at, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_request_comments_request_created ON request_comments(request_id, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_mistakes_created ON mistakes(created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_group_messages_created ON group_messages(created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_hold_images_created ON hold_images(created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_breaks_created ON breaks(created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_break_bookings_created ON break_bookings(created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_logins_created ON _logins(created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_quality_issues_created ON quality_issues(created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_midshift_issues_created ON midshift_issues(created_at)")
+    for index in (
+        "idx_requests_timestamp_id", "idx_request_comments_request", "idx_mistakes_timestamp",
+        "idx_group_messages_timestamp", "idx_hold_images_timestamp", "idx_logins_timestamp",
+        "idx_quality_issues_timestamp", "idx_midshift_issues_timestamp",
+    ):
+        cursor.execute(f"DROP INDEX IF EXISTS {index}")
+
+def backfill_epoch_timestamps(conn, batch_size=EPOCH_BACKFILL_BATCH):
+    """Fill created_at from the TEXT timestamp for rows written before migration 7.
+
+    Commits after every batch so a large backfill never holds the write lock
+    for long. Rows already converted are skipped, so this is cheap to rerun.
+    """
+    cursor = conn.cursor()
+    for table in EPOCH_TABLES:
+        while True:
+            # The TEXT timestamps were written in server local time; rows
+            # whose text does not parse get 0 rather than staying NULL.
+            cursor.execute(f"""
+                UPDATE {table} 
+                SET created_at = IFNULL(CAST(strftime('%s', timestamp, 'utc') AS INTEGER), 0)
+                WHERE id IN (
+                    SELECT id FROM {table} WHERE created_at IS NULL LIMIT ?)
+            """, (batch_size,))
+            conn.commit()
+            if cursor.rowcount < batch_size:
+                break
+
+def _migration_8_request_daily_stats(cursor):
+    """Per-day, per-type request rollup maintained by triggers."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS request_daily_stats (
+            day TEXT NOT NULL,
+            request_type TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            completed INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, request_type)) WITHOUT ROWID
+    """)
+    day = "date(IFNULL({row}.created_at, 0), 'unixepoch', 'localtime')"
+    bump = """
+        INSERT INTO request_daily_stats (day, request_type, total, completed)
+        VALUES (""" + day + """, IFNULL({row}.request_type, ''), {sign}1, {sign}(IFNULL({row}.completed, 0) != 0))
+        ON CONFLICT(day, request_type) DO UPDATE SET
+            total = total + excluded.total,
+            completed = completed + excluded.completed;
+    """
+    prune = """
+        DELETE FROM request_daily_stats
+        WHERE day = """ + day.format(row="old") + """ AND request_type = IFNULL(old.request_type, '') AND total <= 0;
+    """
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS request_daily_stats_ai AFTER INSERT ON requests BEGIN
+            {bump.format(row="new", sign="")}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS request_daily_stats_ad AFTER DELETE ON requests BEGIN
+            {bump.format(row="old", sign="-")}
+            {prune}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS request_daily_stats_au
+        AFTER UPDATE OF completed, request_type, created_at ON requests BEGIN
+            {bump.format(row="old", sign="-")}
+            {bump.format(row="new", sign="")}
+            {prune}
+        END
+    """)
+    rebuild_request_daily_stats(cursor)
+
+def rebuild_request_daily_stats(cursor):
+    """Recompute the daily rollup from the requests table."""
+    cursor.execute("DELETE FROM request_daily_stats")
+    cursor.execute("""
+        INSERT INTO request_daily_stats (day, request_type, total, completed)
+        SELECT date(IFNULL(created_at, 0), 'unixepoch', 'localtime'), IFNULL(request_type, ''),
+               COUNT(*), SUM(IFNULL(completed, 0) != 0)
+        FROM requests
+        GROUP BY 1, 2
+    """)
+
+def _migration_9_agent_indexes(cursor):
+    """(agent_name, created_at) indexes for the per-agent issue views."""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_logins_agent_created ON _logins(agent_name, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_quality_issues_agent_created ON quality_issues(agent_name, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_midshift_issues_agent_created ON midshift_issues(agent_name, created_at)")
+
+def _migration_10_mistakes_agent_index(cursor):
+    """(agent_name, created_at) index on mistakes for the agent scorecard."""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_mistakes_agent_created ON mistakes(agent_name, created_at)")
+
+def _migration_11_unique_break_bookings(cursor):
+    """One booking per user, date and slot, keeping the earliest duplicate."""
+    cursor.execute("""
+        DELETE FROM break_bookings WHERE id NOT IN (
+            SELECT MIN(id) FROM break_bookings GROUP BY booking_date, break_id, username)
+    """)
+    # Its (booking_date, break_id) prefix also serves the per-slot counts.
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_break_bookings_unique
+        ON break_bookings(booking_date, break_id, username)
+    """)
+    cursor.execute("DROP INDEX IF EXISTS idx_break_bookings_date")
+
+def _migration_12_break_schedule_templates(cursor):
+    """Date-scoped break slots and the recurring templates that generate them.
+
+    A slot with a NULL slot_date applies to every day, as all slots did
+    before; generated slots carry the single date they apply to.
+    """
+    cursor.execute("ALTER TABLE breaks ADD COLUMN slot_date TEXT")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_breaks_slot_date ON breaks(slot_date, start_time)")
+    # Regenerating a template over the same dates must not duplicate slots.
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_breaks_slot_date_unique
+        ON breaks(slot_date, start_time, break_name) WHERE slot_date IS NOT NULL
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS break_templates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            template_name TEXT,
+            weekday INTEGER,
+            break_name TEXT,
+            start_time TEXT,
+            end_time TEXT,
+            max_users INTEGER,
+            created_by TEXT,
+            timestamp TEXT,
+            created_at INTEGER)
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_break_templates_name ON break_templates(template_name, weekday)")
+
+def _migration_13_change_log_update_columns(cursor):
+    """Publish updates only when a column in TABLE_COLUMNS changes.
+
+    The migration 6 triggers fired on any UPDATE, so the created_at
+    backfill logged every historical row as changed.
+    """
+    for table in CHANGE_FEED_TABLES:
+        columns = ", ".join(c for c in TABLE_COLUMNS[table].split(", ") if c != "id")
+        cursor.execute(f"DROP TRIGGER IF EXISTS change_log_{table}_update")
+        cursor.execute(f"""
+            CREATE TRIGGER change_log_{table}_update AFTER UPDATE OF {columns} ON {table} BEGIN
+                INSERT INTO change_log (table_name, row_id, op) VALUES ('{table}', new.id, 'update');
+            END
         """)
-        
+
+# Ordered (version, migration) pairs. Append new entries; never edit or
+# reorder ones that have shipped.
+MIGRATIONS = [
+    (1, _migration_1_base_schema),
+    (2, _migration_2_indexes),
+    (3, _migration_3_requests_keyset_index),
+    (4, _migration_4_full_text_search),
+    (5, _migration_5_counters),
+    (6, _migration_6_change_log),
+    (7, _migration_7_epoch_timestamps),
+    (8, _migration_8_request_daily_stats),
+    (9, _migration_9_agent_indexes),
+    (10, _migration_10_mistakes_agent_index),
+    (11, _migration_11_unique_break_bookings),
+    (12, _migration_12_break_schedule_templates),
+    (13, _migration_13_change_log_update_columns),
+]
+
+def run_migrations(conn):
+    """Apply every migration newer than the recorded schema version."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            applied_at TEXT)
+    """)
+    conn.commit()
+
+    # Take the write lock before reading the version so that two processes
+    # starting together cannot apply the same migration twice.
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        cursor.execute("SELECT IFNULL(MAX(version), 0) FROM schema_version")
+        current = cursor.fetchone()[0]
+        for version, migrate in MIGRATIONS:
+            if version <= current:
+                continue
+            migrate(cursor)
+            cursor.execute("INSERT INTO schema_version (version, applied_at) VALUES (?, ?)",
+                          (version, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+@st.cache_resource
+def init_db():
+    """Bring the schema up to date. Runs once per process, not per rerun."""
+    with get_db_connection() as conn:
+        run_migrations(conn)
+        backfill_epoch_timestamps(conn)
+    return True
+
+@st.cache_resource
+def fts_available():
+    """True when the FTS5 search indexes were created by the migrations."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS midshift_issues (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                agent_name TEXT,
-                issue_type TEXT,
-                start_time TEXT,
-                end_time TEXT,
-                timestamp TEXT)
+            SELECT COUNT(*) FROM sqlite_master 
+            WHERE type = 'table' AND name IN ('requests_fts', 'mistakes_fts')
         """)
-        
-        # Create default admin account
-        cursor.execute("""
-            INSERT OR IGNORE INTO users (username, password, role) 
-            VALUES (?, ?, ?)
-        """, ("taha kirri", hash_password("arise@99"), "admin"))
-        admin_accounts = [
-            ("taha kirri", "arise@99"),
-            ("admin", "Admin@3356"),
-        ]
-        
-        for username, password in admin_accounts:
-            cursor.execute("""
-                INSERT OR IGNORE INTO users (username, password, role) 
-                VALUES (?, ?, ?)
-            """, (username, hash_password(password), "admin"))
-        
-        # Create agent accounts (agent name as username, workspace ID as password)
-        agents = [
-            ("agent", "Agent@123"),
-        ]
-        
-        for agent_name, workspace_id in agents:
-            cursor.execute("""
-                INSERT OR IGNORE INTO users (username, password, role) 
-                VALUES (?, ?, ?)
-            """, (agent_name, hash_password(workspace_id), "agent"))
-        
-        conn.commit()
-    finally:
-        conn.close()
+        return cursor.fetchone()[0] == len(FTS_COLUMNS)
 
-def is_killswitch_enabled():
-    conn = get_db_connection()
-    try:
+def build_fts_query(text):
+    """Turn free text into an FTS5 query: every word must match as a prefix."""
+    words = re.findall(r"\w+", text)
+    return " ".join(f'"{word}"*' for word in words)
+
+@st.cache_data(show_spinner=False)
+def get_system_settings():
+    """Killswitch flags, cached in process memory until a toggle clears them."""
+    with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT killswitch_enabled FROM system_settings WHERE id = 1")
+        cursor.execute("SELECT killswitch_enabled, chat_killswitch_enabled FROM system_settings WHERE id = 1")
         result = cursor.fetchone()
-        return bool(result[0]) if result else False
-    finally:
-        conn.close()
+        return {
+            "killswitch_enabled": bool(result[0]) if result else False,
+            "chat_killswitch_enabled": bool(result[1]) if result else False,
+        }
+
+def is_killswitch_enabled():
+    return get_system_settings()["killswitch_enabled"]
 
 def is_chat_killswitch_enabled():
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT chat_killswitch_enabled FROM system_settings WHERE id = 1")
-        result = cursor.fetchone()
-        return bool(result[0]) if result else False
-    finally:
-        conn.close()
+    return get_system_settings()["chat_killswitch_enabled"]
 
 def toggle_killswitch(enable):
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("UPDATE system_settings SET killswitch_enabled = ? WHERE id = 1",
                       (1 if enable else 0,))
         conn.commit()
-        return True
-    finally:
-        conn.close()
+    get_system_settings.clear()
+    return True
 
 def toggle_chat_killswitch(enable):
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("UPDATE system_settings SET chat_killswitch_enabled = ? WHERE id = 1",
                       (1 if enable else 0,))
         conn.commit()
-        return True
-    finally:
-        conn.close()
+    get_system_settings.clear()
+    return True
 
 def add_request(agent_name, request_type, identifier, comment):
     if is_killswitch_enabled():
         st.error("System is currently locked. Please contact the developer.")
         return False
         
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        timestamp, created_at = now_timestamps()
         cursor.execute("""
-            INSERT INTO requests (agent_name, request_type, identifier, comment, timestamp) 
-            VALUES (?, ?, ?, ?, ?)
-        """, (agent_name, request_type, identifier, comment, timestamp))
+            INSERT INTO requests (agent_name, request_type, identifier, comment, timestamp, created_at) 
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (agent_name, request_type, identifier, comment, timestamp, created_at))
         
         request_id = cursor.lastrowid
         
         cursor.execute("""
-            INSERT INTO request_comments (request_id, user, comment, timestamp)
-            VALUES (?, ?, ?, ?)
-        """, (request_id, agent_name, f"Request created: {comment}", timestamp))
+            INSERT INTO request_comments (request_id, user, comment, timestamp, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (request_id, agent_name, f"Request created: {comment}", timestamp, created_at))
         
         conn.commit()
+        bump_data_version("requests", "request_comments")
         return True
-    finally:
-        conn.close()
 
-def get_requests():
-    conn = get_db_connection()
-    try:
+@cached_read("requests", "mistakes", "group_messages")
+def get_counters():
+    """All row counters as {name: value}; one read of a tiny table.
+
+    Names are 'requests', 'requests_pending', 'requests_type:<type>',
+    'mistakes' and 'group_messages'.
+    """
+    with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM requests ORDER BY timestamp DESC")
-        return cursor.fetchall()
-    finally:
-        conn.close()
+        cursor.execute("SELECT name, value FROM counters")
+        return dict(cursor.fetchall())
 
-def search_requests(query):
-    conn = get_db_connection()
-    try:
+CHANGE_FEED_LIMIT = 500
+
+def get_change_feed_position():
+    """Id of the newest change_log entry; the starting high-water mark for a session."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT IFNULL(MAX(id), 0) FROM change_log")
+        return cursor.fetchone()[0]
+
+def get_changes_since(since_id, limit=CHANGE_FEED_LIMIT):
+    """Rows inserted or updated after the `since_id` high-water mark.
+
+    Returns (new_mark, changes) where changes is
+    {table: {"insert": [rows], "update": [rows]}} for every table in
+    CHANGE_FEED_TABLES. Rows deleted since the change are skipped, so clears
+    never show up as activity.
+    """
+    changes = {table: {"insert": [], "update": []} for table in CHANGE_FEED_TABLES}
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, table_name, row_id, op FROM change_log 
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+        """, (since_id, limit))
+        entries = cursor.fetchall()
+        if not entries:
+            return since_id, changes
+        
+        ids_by_table = {}
+        for _, table, row_id, _ in entries:
+            ids_by_table.setdefault(table, set()).add(row_id)
+        rows = {}
+        for table, ids in ids_by_table.items():
+            ids = list(ids)
+            placeholders = ",".join("?" * len(ids))
+            cursor.execute(f"SELECT {TABLE_COLUMNS[table]} FROM {table} WHERE id IN ({placeholders})", ids)
+            rows[table] = {row[0]: row for row in cursor.fetchall()}
+    
+    seen = set()
+    for _, table, row_id, op in entries:
+        row = rows[table].get(row_id)
+        if row is None or (table, row_id, op) in seen:
+            continue
+        seen.add((table, row_id, op))
+        changes[table][op].append(row)
+    return entries[-1][0], changes
+
+REQUESTS_PAGE_SIZE = 50
+
+@cached_read("requests")
+def get_requests_page(before=None, limit=REQUESTS_PAGE_SIZE):
+    """Return (rows, next_before): up to `limit` requests, newest first.
+
+    `before` is the (created_at, id) cursor returned with the previous page;
+    None starts from the newest request. next_before is None on the last page.
+    """
+    with get_db_connection() as conn:
         cursor = conn.cursor()
+        # One extra row tells us whether another page exists.
+        if before is None:
+            cursor.execute("""
+                SELECT id, agent_name, request_type, identifier, comment, timestamp, completed, created_at
+                FROM requests 
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+            """, (limit + 1,))
+        else:
+            cursor.execute("""
+                SELECT id, agent_name, request_type, identifier, comment, timestamp, completed, created_at
+                FROM requests 
+                WHERE (created_at, id) < (?, ?)
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+            """, (before[0], before[1], limit + 1))
+        rows = cursor.fetchall()
+    page = [row[:-1] for row in rows[:limit]]
+    next_before = (rows[limit - 1][-1], rows[limit - 1][0]) if len(rows) > limit else None
+    return page, next_before
+
+SEARCH_RESULT_LIMIT = 200
+
+@cached_read("requests")
+def search_requests(query, limit=SEARCH_RESULT_LIMIT):
+    """Requests matching `query`, best match first (newest first on the LIKE fallback)."""
+    match = build_fts_query(query)
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        if match and fts_available():
+            cursor.execute("""
+                SELECT r.id, r.agent_name, r.request_type, r.identifier, r.comment, r.timestamp, r.completed
+                FROM requests_fts f
+                JOIN requests r ON r.id = f.rowid
+                WHERE requests_fts MATCH ?
+                ORDER BY f.rank
+                LIMIT ?
+            """, (match, limit))
+            return cursor.fetchall()
         query = f"%{query.lower()}%"
         cursor.execute("""
-            SELECT * FROM requests 
+            SELECT id, agent_name, request_type, identifier, comment, timestamp, completed
+            FROM requests 
             WHERE LOWER(agent_name) LIKE ? 
             OR LOWER(request_type) LIKE ? 
             OR LOWER(identifier) LIKE ? 
             OR LOWER(comment) LIKE ?
-            ORDER BY timestamp DESC
-        """, (query, query, query, query))
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?
+        """, (query, query, query, query, limit))
         return cursor.fetchall()
-    finally:
-        conn.close()
 
 def update_request_status(request_id, completed):
     if is_killswitch_enabled():
         st.error("System is currently locked. Please contact the developer.")
         return False
         
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("UPDATE requests SET completed = ? WHERE id = ?",
                       (1 if completed else 0, request_id))
         conn.commit()
+        bump_data_version("requests")
         return True
-    finally:
-        conn.close()
 
 def add_request_comment(request_id, user, comment):
     if is_killswitch_enabled():
         st.error("System is currently locked. Please contact the developer.")
         return False
         
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            INSERT INTO request_comments (request_id, user, comment, timestamp)
-            VALUES (?, ?, ?, ?)
-        """, (request_id, user, comment, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            INSERT INTO request_comments (request_id, user, comment, timestamp, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (request_id, user, comment, *now_timestamps()))
         conn.commit()
+        bump_data_version("request_comments")
         return True
-    finally:
-        conn.close()
 
-def get_request_comments(request_id):
-    conn = get_db_connection()
-    try:
+# Keeps each IN (...) list well under SQLite's bound-parameter limit.
+COMMENT_BATCH_SIZE = 500
+
+@cached_read("request_comments")
+def get_comments_for_requests(request_ids):
+    """Return {request_id: [comment rows]} for many requests in one round-trip per batch."""
+    request_ids = list(dict.fromkeys(request_ids))
+    comments = {req_id: [] for req_id in request_ids}
+    if not request_ids:
+        return comments
+    with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT * FROM request_comments 
-            WHERE request_id = ?
-            ORDER BY timestamp ASC
-        """, (request_id,))
-        return cursor.fetchall()
-    finally:
-        conn.close()
+        for i in range(0, len(request_ids), COMMENT_BATCH_SIZE):
+            batch = request_ids[i:i + COMMENT_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            cursor.execute(f"""
+                SELECT id, request_id, user, comment, timestamp
+                FROM request_comments 
+                WHERE request_id IN ({placeholders})
+                ORDER BY request_id, created_at ASC, id ASC
+            """, batch)
+            for row in cursor.fetchall():
+                comments[row[1]].append(row)
+    return comments
 
 def add_mistake(team_leader, agent_name, ticket_id, error_description):
     if is_killswitch_enabled():
         st.error("System is currently locked. Please contact the developer.")
         return False
         
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            INSERT INTO mistakes (team_leader, agent_name, ticket_id, error_description, timestamp) 
-            VALUES (?, ?, ?, ?, ?)
+            INSERT INTO mistakes (team_leader, agent_name, ticket_id, error_description, timestamp, created_at) 
+            VALUES (?, ?, ?, ?, ?, ?)
         """, (team_leader, agent_name, ticket_id, error_description,
-             datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+             *now_timestamps()))
         conn.commit()
+        bump_data_version("mistakes")
         return True
-    finally:
-        conn.close()
 
-def get_mistakes():
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM mistakes ORDER BY timestamp DESC")
-        return cursor.fetchall()
-    finally:
-        conn.close()
-
-def search_mistakes(query):
-    conn = get_db_connection()
-    try:
+@cached_read("mistakes")
+def search_mistakes(query, limit=SEARCH_RESULT_LIMIT):
+    """Mistakes matching `query`, best match first (newest first on the LIKE fallback)."""
+    match = build_fts_query(query)
+    with get_db_connection() as conn:
         cursor = conn.cursor()
+        if match and fts_available():
+            cursor.execute("""
+                SELECT m.id, m.team_leader, m.agent_name, m.ticket_id, m.error_description, m.timestamp
+                FROM mistakes_fts f
+                JOIN mistakes m ON m.id = f.rowid
+                WHERE mistakes_fts MATCH ?
+                ORDER BY f.rank
+                LIMIT ?
+            """, (match, limit))
+            return cursor.fetchall()
         query = f"%{query.lower()}%"
         cursor.execute("""
-            SELECT * FROM mistakes 
+            SELECT id, team_leader, agent_name, ticket_id, error_description, timestamp
+            FROM mistakes 
             WHERE LOWER(agent_name) LIKE ? 
             OR LOWER(ticket_id) LIKE ? 
             OR LOWER(error_description) LIKE ?
-            ORDER BY timestamp DESC
-        """, (query, query, query))
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?
+        """, (query, query, query, limit))
         return cursor.fetchall()
-    finally:
-        conn.close()
 
 def send_group_message(sender, message):
     if is_killswitch_enabled() or is_chat_killswitch_enabled():
         st.error("Chat is currently locked. Please contact the developer.")
         return False
         
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         mentions = re.findall(r'@(\w+)', message)
         cursor.execute("""
-            INSERT INTO group_messages (sender, message, timestamp, mentions) 
-            VALUES (?, ?, ?, ?)
-        """, (sender, message, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 
-             ','.join(mentions)))
+            INSERT INTO group_messages (sender, message, mentions, timestamp, created_at) 
+            VALUES (?, ?, ?, ?, ?)
+        """, (sender, message, ','.join(mentions), *now_timestamps()))
         conn.commit()
+        bump_data_version("group_messages")
         return True
-    finally:
-        conn.close()
 
+@cached_read("group_messages")
 def get_group_messages():
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM group_messages ORDER BY timestamp DESC LIMIT 50")
+        cursor.execute("""
+            SELECT id, sender, message, timestamp, mentions
+            FROM group_messages ORDER BY created_at DESC, id DESC LIMIT 50
+        """)
         return cursor.fetchall()
-    finally:
-        conn.close()
 
+@cached_read("users")
 def get_all_users():
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT id, username, role FROM users")
         return cursor.fetchall()
-    finally:
-        conn.close()
 
 def add_user(username, password, role):
     if is_killswitch_enabled():
         st.error("System is currently locked. Please contact the developer.")
         return False
         
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
                       (username, hash_password(password), role))
         conn.commit()
+        bump_data_version("users")
         return True
-    finally:
-        conn.close()
 
 def delete_user(user_id):
     if is_killswitch_enabled():
         st.error("System is currently locked. Please contact the developer.")
         return False
         
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
         conn.commit()
+        bump_data_version("users")
         return True
-    finally:
-        conn.close()
 
 def add_hold_image(uploader, image_data):
     if is_killswitch_enabled():
         st.error("System is currently locked. Please contact the developer.")
         return False
         
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            INSERT INTO hold_images (uploader, image_data, timestamp) 
-            VALUES (?, ?, ?)
-        """, (uploader, image_data, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            INSERT INTO hold_images (uploader, image_data, timestamp, created_at) 
+            VALUES (?, ?, ?, ?)
+        """, (uploader, image_data, *now_timestamps()))
         conn.commit()
+        bump_data_version("hold_images")
         return True
-    finally:
-        conn.close()
 
+@cached_read("hold_images")
 def get_hold_images():
-    conn = get_db_connection()
-    try:
+    """(id, uploader, timestamp) per image; the bytes come from get_hold_image_data()."""
+    with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM hold_images ORDER BY timestamp DESC")
+        cursor.execute("""
+            SELECT id, uploader, timestamp
+            FROM hold_images ORDER BY created_at DESC, id DESC
+        """)
         return cursor.fetchall()
-    finally:
-        conn.close()
+
+def get_hold_image_data(image_id):
+    """Image bytes for one HOLD image, read on demand and never cached."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT image_data FROM hold_images WHERE id = ?", (image_id,))
+        row = cursor.fetchone()
+        return row[0] if row else None
 
 def clear_hold_images():
     if is_killswitch_enabled():
         st.error("System is currently locked. Please contact the developer.")
         return False
         
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("DELETE FROM hold_images")
         conn.commit()
+        bump_data_version("hold_images")
         return True
-    finally:
-        conn.close()
 
 def clear_all_requests():
     if is_killswitch_enabled():
         st.error("System is currently locked. Please contact the developer.")
         return False
         
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("DELETE FROM requests")
         cursor.execute("DELETE FROM request_comments")
         conn.commit()
+        bump_data_version("requests", "request_comments")
+        return True
+
+def rebuild_statistics():
+    """Recompute the counters and the daily request rollup from scratch."""
+    if is_killswitch_enabled():
+        st.error("System is currently locked. Please contact the developer.")
+        return False
+        
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        rebuild_counters(cursor)
+        rebuild_request_daily_stats(cursor)
+        conn.commit()
+        bump_data_version("requests", "mistakes", "group_messages")
         return True
-    finally:
-        conn.close()
 
 def clear_all_mistakes():
     if is_killswitch_enabled():
         st.error("System is currently locked. Please contact the developer.")
         return False
         
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("DELETE FROM mistakes")
         conn.commit()
+        bump_data_version("mistakes")
         return True
-    finally:
-        conn.close()
 
 def clear_all_group_messages():
     if is_killswitch_enabled():
         st.error("System is currently locked. Please contact the developer.")
         return False
         
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("DELETE FROM group_messages")
         conn.commit()
+        bump_data_version("group_messages")
         return True
-    finally:
-        conn.close()
 
 def add_break_slot(break_name, start_time, end_time, max_users, created_by):
     if is_killswitch_enabled():
         st.error("System is currently locked. Please contact the developer.")
         return False
         
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            INSERT INTO breaks (break_name, start_time, end_time, max_users, created_by, timestamp) 
-            VALUES (?, ?, ?, ?, ?, ?)
+            INSERT INTO breaks (break_name, start_time, end_time, max_users, created_by, timestamp, created_at) 
+            VALUES (?, ?, ?, ?, ?, ?, ?)
         """, (break_name, start_time, end_time, max_users, created_by,
-             datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+             *now_timestamps()))
         conn.commit()
+        bump_data_version("breaks")
         return True
-    finally:
-        conn.close()
 
-def update_break_slot(break_id, break_name, start_time, end_time, max_users):
+def update_break_slots(changes):
+    """Apply (break_id, break_name, start_time, end_time, max_users) rows in one commit.
+
+    Nothing is saved if an edit would give a dated slot the same name and
+    start time as another slot on its date.
+    """
     if is_killswitch_enabled():
         st.error("System is currently locked. Please contact the developer.")
         return False
         
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE breaks 
-            SET break_name = ?, start_time = ?, end_time = ?, max_users = ?
-            WHERE id = ?
-        """, (break_name, start_time, end_time, max_users, break_id))
+        try:
+            cursor.executemany("""
+                UPDATE breaks 
+                SET break_name = ?, start_time = ?, end_time = ?, max_users = ?
+                WHERE id = ?
+            """, [(name, start, end, max_users, b_id) for b_id, name, start, end, max_users in changes])
+        except sqlite3.IntegrityError:
+            conn.rollback()
+            st.error("Another break on the same date already has that name and start time. No changes were saved.")
+            return False
         conn.commit()
+        bump_data_version("breaks")
         return True
-    finally:
-        conn.close()
 
-def get_all_break_slots():
-    conn = get_db_connection()
-    try:
+@cached_read("breaks")
+def get_break_slots(date):
+    """Slots that apply on `date`: the every-day slots plus those generated for it."""
+    with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM breaks ORDER BY start_time")
+        cursor.execute("""
+            SELECT id, break_name, start_time, end_time, max_users, current_users, created_by, timestamp
+            FROM breaks WHERE slot_date = ? OR slot_date IS NULL
+            ORDER BY start_time
+        """, (date,))
         return cursor.fetchall()
-    finally:
-        conn.close()
 
-def get_available_break_slots(date):
-    conn = get_db_connection()
-    try:
+# Most booking dates kept in the occupancy map; the oldest loaded go first.
+BREAK_OCCUPANCY_MAX_DATES = 31
+
+@st.cache_resource
+def _get_break_occupancy():
+    """Process-wide {booking_date: {break_id: {username: booking}}} map and its lock.
+
+    A booking is (id, user_id, timestamp). Dates are loaded from the
+    database on first read and then kept current by the booking writers,
+    so the Breaks page reads occupancy without touching the database.
+    Past dates are evicted as the map is read and at most
+    BREAK_OCCUPANCY_MAX_DATES are kept. Like the data versions, writes
+    made by another process are not seen.
+    """
+    return {}, threading.Lock()
+
+def _load_break_occupancy(date):
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            SELECT b.* 
-            FROM breaks b
-            LEFT JOIN (
-                SELECT break_id, COUNT(*) as booking_count
-                FROM break_bookings 
-                WHERE booking_date = ?
-                GROUP BY break_id
-            ) bb ON b.id = bb.break_id
-            WHERE b.max_users > IFNULL(bb.booking_count, 0)
-            ORDER BY b.start_time
+            SELECT break_id, username, id, user_id, timestamp
+            FROM break_bookings WHERE booking_date = ?
         """, (date,))
-        return cursor.fetchall()
-    finally:
-        conn.close()
+        rows = cursor.fetchall()
+    slots = {}
+    for break_id, username, booking_id, user_id, timestamp in rows:
+        slots.setdefault(break_id, {})[username] = (booking_id, user_id, timestamp)
+    return slots
+
+def get_break_occupancy(date):
+    """{break_id: {username: (booking_id, user_id, timestamp)}} for `date`, as a copy."""
+    occupancy, lock = _get_break_occupancy()
+    today = datetime.now().strftime("%Y-%m-%d")
+    with lock:
+        # A past date stays only while it is the one being read.
+        for cached in [cached for cached in occupancy if cached < today and cached != date]:
+            del occupancy[cached]
+        if date not in occupancy:
+            occupancy[date] = _load_break_occupancy(date)
+            while len(occupancy) > BREAK_OCCUPANCY_MAX_DATES:
+                del occupancy[next(iter(occupancy))]
+        return {break_id: dict(bookings) for break_id, bookings in occupancy[date].items()}
+
+def get_available_break_slots(date):
+    """Slots with room left on `date`; the last column is the remaining capacity."""
+    occupancy = get_break_occupancy(date)
+    available = []
+    for slot in get_break_slots(date):
+        remaining = slot[4] - len(occupancy.get(slot[0], ()))
+        if remaining > 0:
+            available.append((*slot, remaining))
+    return available
+
+# Outcomes of book_break_slot() other than the kill switch's False.
+BOOKING_CONFIRMED = "booked"
+BOOKING_FULL = "full"
+BOOKING_DUPLICATE = "already_booked"
+BOOKING_UNAVAILABLE = "unavailable"
 
 def book_break_slot(break_id, user_id, username, booking_date):
+    """Book a slot if it still has room; returns one of the BOOKING_* outcomes.
+
+    The capacity check and the insert run as one statement inside a
+    BEGIN IMMEDIATE transaction, so concurrent bookers are serialised on
+    the write lock and each sees the bookings committed before it. The
+    unique (booking_date, break_id, username) index rejects repeats.
+    BOOKING_UNAVAILABLE means the slot was deleted or does not apply on
+    `booking_date`.
+    """
     if is_killswitch_enabled():
         st.error("System is currently locked. Please contact the developer.")
         return False
         
-    conn = get_db_connection()
-    try:
+    timestamp, created_at = now_timestamps()
+    with get_db_connection() as conn:
         cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
         cursor.execute("""
-            INSERT INTO break_bookings (break_id, user_id, username, booking_date, timestamp) 
-            VALUES (?, ?, ?, ?, ?)
-        """, (break_id, user_id, username, booking_date,
-             datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-        conn.commit()
-        return True
-    finally:
-        conn.close()
+            INSERT OR IGNORE INTO break_bookings (break_id, user_id, username, booking_date, timestamp, created_at)
+            SELECT b.id, ?, ?, ?, ?, ?
+            FROM breaks b
+            WHERE b.id = ? AND (b.slot_date IS NULL OR b.slot_date = ?) AND b.max_users > (
+                SELECT COUNT(*) FROM break_bookings
+                WHERE booking_date = ? AND break_id = b.id)
+        """, (user_id, username, booking_date, timestamp, created_at, break_id, booking_date, booking_date))
+        if cursor.rowcount:
+            booking_id = cursor.lastrowid
+            conn.commit()
+            bump_data_version("break_bookings")
+            occupancy, lock = _get_break_occupancy()
+            with lock:
+                if booking_date in occupancy:
+                    occupancy[booking_date].setdefault(break_id, {})[username] = (booking_id, user_id, timestamp)
+            return BOOKING_CONFIRMED
+        # Still under the write lock, so the reason matches what the insert saw.
+        cursor.execute("""
+            SELECT
+                EXISTS (SELECT 1 FROM breaks
+                        WHERE id = ? AND (slot_date IS NULL OR slot_date = ?)),
+                EXISTS (SELECT 1 FROM break_bookings
+                        WHERE booking_date = ? AND break_id = ? AND username = ?)
+        """, (break_id, booking_date, booking_date, break_id, username))
+        slot_applies, already_booked = cursor.fetchone()
+        conn.rollback()
+        if not slot_applies:
+            return BOOKING_UNAVAILABLE
+        return BOOKING_DUPLICATE if already_booked else BOOKING_FULL
+
+def _booking_rows(date, slots):
+    """Booking rows for `slots` on `date`, shaped like break_bookings joined to breaks."""
+    occupancy = get_break_occupancy(date)
+    rows = []
+    for b_id, name, start, end, *_ in slots:
+        for username, (booking_id, user_id, timestamp) in occupancy.get(b_id, {}).items():
+            rows.append((booking_id, b_id, user_id, username, date, timestamp, name, start, end))
+    return rows
 
 def get_user_bookings(username, date):
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT bb.*, b.break_name, b.start_time, b.end_time
-            FROM break_bookings bb
-            JOIN breaks b ON bb.break_id = b.id
-            WHERE bb.username = ? AND bb.booking_date = ?
-        """, (username, date))
-        return cursor.fetchall()
-    finally:
-        conn.close()
+    return [row for row in _booking_rows(date, get_break_slots(date)) if row[3] == username]
 
 def get_all_bookings(date):
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT bb.*, b.break_name, b.start_time, b.end_time, u.role
-            FROM break_bookings bb
-            JOIN breaks b ON bb.break_id = b.id
-            JOIN users u ON bb.user_id = u.id
-            WHERE bb.booking_date = ?
-            ORDER BY b.start_time, bb.username
-        """, (date,))
-        return cursor.fetchall()
-    finally:
-        conn.close()
+    roles = {user_id: role for user_id, _, role in get_all_users()}
+    rows = [(*row, roles[row[2]]) for row in _booking_rows(date, get_break_slots(date)) if row[2] in roles]
+    return sorted(rows, key=lambda row: (row[7], row[3]))
 
 def delete_break_slot(break_id):
     if is_killswitch_enabled():
         st.error("System is currently locked. Please contact the developer.")
         return False
         
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("DELETE FROM breaks WHERE id = ?", (break_id,))
         cursor.execute("DELETE FROM break_bookings WHERE break_id = ?", (break_id,))
         conn.commit()
+        bump_data_version("breaks", "break_bookings")
+        occupancy, lock = _get_break_occupancy()
+        with lock:
+            for slots in occupancy.values():
+                slots.pop(break_id, None)
         return True
-    finally:
-        conn.close()
 
 def clear_all_break_bookings():
     if is_killswitch_enabled():
         st.error("System is currently locked. Please contact the developer.")
         return False
         
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("DELETE FROM break_bookings")
         conn.commit()
+        bump_data_version("break_bookings")
+        occupancy, lock = _get_break_occupancy()
+        with lock:
+            occupancy.clear()
         return True
-    finally:
-        conn.close()
 
-def add__login(agent_name, presence_time, login_time, reason):
+# break_templates.weekday follows date.weekday(); NULL means every day.
+WEEKDAY_LABELS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+def add_break_template(template_name, weekday, break_name, start_time, end_time, max_users, created_by):
     if is_killswitch_enabled():
         st.error("System is currently locked. Please contact the developer.")
         return False
         
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            INSERT INTO _logins (agent_name, presence_time, login_time, reason, timestamp) 
-            VALUES (?, ?, ?, ?, ?)
-        """, (agent_name, presence_time, login_time, reason,
-             datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            INSERT INTO break_templates (template_name, weekday, break_name, start_time, end_time, max_users,
+                                         created_by, timestamp, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (template_name, weekday, break_name, start_time, end_time, max_users, created_by,
+             *now_timestamps()))
         conn.commit()
+        bump_data_version("break_templates")
         return True
-    finally:
-        conn.close()
 
-def get_late_logins():
-    conn = get_db_connection()
-    try:
+@cached_read("break_templates")
+def get_break_templates():
+    with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM late_logins ORDER BY timestamp DESC")
+        cursor.execute("""
+            SELECT id, template_name, weekday, break_name, start_time, end_time, max_users
+            FROM break_templates ORDER BY template_name, weekday, start_time
+        """)
         return cursor.fetchall()
-    finally:
-        conn.close()
 
-def add_quality_issue(agent_name, issue_type, timing, mobile_number, product):
+def delete_break_template(template_id):
     if is_killswitch_enabled():
         st.error("System is currently locked. Please contact the developer.")
         return False
         
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM break_templates WHERE id = ?", (template_id,))
+        conn.commit()
+        bump_data_version("break_templates")
+        return True
+
+def generate_break_slots(template_name, first_date, last_date, created_by):
+    """Create the template's slots for every date in [first_date, last_date].
+
+    All rows go in with one executemany and one commit. A line whose name
+    and start time are already taken on a date, by an earlier run or
+    another template, is skipped, so regenerating a range is safe. Returns
+    (created, skipped), where skipped lists the (date, break_name,
+    start_time) lines left out.
+    """
+    if is_killswitch_enabled():
+        st.error("System is currently locked. Please contact the developer.")
+        return False
+        
+    lines = [t for t in get_break_templates() if t[1] == template_name]
+    timestamp, created_at = now_timestamps()
+    rows = []
+    day = first_date
+    while day <= last_date:
+        for _, _, weekday, break_name, start_time, end_time, max_users in lines:
+            if weekday is None or weekday == day.weekday():
+                rows.append((break_name, start_time, end_time, max_users, created_by,
+                             timestamp, created_at, day.strftime("%Y-%m-%d")))
+        day += timedelta(days=1)
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        # Hold the write lock so the taken slots cannot change before the insert.
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("""
+            SELECT slot_date, start_time, break_name FROM breaks
+            WHERE slot_date BETWEEN ? AND ?
+        """, (first_date.strftime("%Y-%m-%d"), last_date.strftime("%Y-%m-%d")))
+        taken = set(cursor.fetchall())
+        new_rows, skipped = [], []
+        for row in rows:
+            key = (row[7], row[1], row[0])
+            if key in taken:
+                skipped.append((row[7], row[0], row[1]))
+            else:
+                taken.add(key)
+                new_rows.append(row)
+        cursor.executemany("""
+            INSERT INTO breaks (break_name, start_time, end_time, max_users, created_by,
+                                timestamp, created_at, slot_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, new_rows)
+        conn.commit()
+    bump_data_version("breaks")
+    return len(new_rows), skipped
+
+def purge_break_dates(before_date):
+    """Delete dated slots and bookings before `before_date` with ranged deletes.
+
+    Every-day slots are kept. Returns (slots, bookings) deleted.
+    """
+    if is_killswitch_enabled():
+        st.error("System is currently locked. Please contact the developer.")
+        return False
+        
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM break_bookings WHERE booking_date < ?", (before_date,))
+        bookings = cursor.rowcount
+        cursor.execute("DELETE FROM breaks WHERE slot_date < ?", (before_date,))
+        slots = cursor.rowcount
+        conn.commit()
+        bump_data_version("breaks", "break_bookings")
+        occupancy, lock = _get_break_occupancy()
+        with lock:
+            for date in [date for date in occupancy if date < before_date]:
+                del occupancy[date]
+        return slots, bookings
+
+def add_late_login(agent_name, presence_time, login_time, reason):
+    if is_killswitch_enabled():
+        st.error("System is currently locked. Please contact the developer.")
+        return False
+        
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            INSERT INTO quality_issues (agent_name, issue_type, timing, mobile_number, product, timestamp) 
+            INSERT INTO _logins (agent_name, presence_time, login_time, reason, timestamp, created_at) 
             VALUES (?, ?, ?, ?, ?, ?)
-        """, (agent_name, issue_type, timing, mobile_number, product,
-             datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        """, (agent_name, presence_time, login_time, reason,
+             *now_timestamps()))
         conn.commit()
+        bump_data_version("_logins")
         return True
-    finally:
-        conn.close()
 
-def get_quality_issues():
-    conn = get_db_connection()
-    try:
+def add_quality_issue(agent_name, issue_type, timing, mobile_number, product):
+    if is_killswitch_enabled():
+        st.error("System is currently locked. Please contact the developer.")
+        return False
+        
+    with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM quality_issues ORDER BY timestamp DESC")
-        return cursor.fetchall()
-    finally:
-        conn.close()
+        cursor.execute("""
+            INSERT INTO quality_issues (agent_name, issue_type, timing, mobile_number, product, timestamp, created_at) 
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (agent_name, issue_type, timing, mobile_number, product,
+             *now_timestamps()))
+        conn.commit()
+        bump_data_version("quality_issues")
+        return True
 
 def add_midshift_issue(agent_name, issue_type, start_time, end_time):
     if is_killswitch_enabled():
         st.error("System is currently locked. Please contact the developer.")
         return False
         
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            INSERT INTO midshift_issues (agent_name, issue_type, start_time, end_time, timestamp) 
-            VALUES (?, ?, ?, ?, ?)
+            INSERT INTO midshift_issues (agent_name, issue_type, start_time, end_time, timestamp, created_at) 
+            VALUES (?, ?, ?, ?, ?, ?)
         """, (agent_name, issue_type, start_time, end_time,
-             datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+             *now_timestamps()))
         conn.commit()
+        bump_data_version("midshift_issues")
         return True
-    finally:
-        conn.close()
 
-def get_midshift_issues():
-    conn = get_db_connection()
-    try:
+# Display labels for the issue report tables, keyed by column name.
+LATE_LOGIN_LABELS = {
+    "agent_name": "Agent's Name",
+    "presence_time": "Time of presence",
+    "login_time": "Time of log in",
+    "reason": "Reason",
+    "timestamp": "Reported at",
+}
+QUALITY_ISSUE_LABELS = {
+    "agent_name": "Agent's Name",
+    "issue_type": "Type of issue",
+    "timing": "Timing",
+    "mobile_number": "Mobile number",
+    "product": "Product",
+    "timestamp": "Reported at",
+}
+MIDSHIFT_ISSUE_LABELS = {
+    "agent_name": "Agent's Name",
+    "issue_type": "Issue Type",
+    "start_time": "Start time",
+    "end_time": "End Time",
+    "timestamp": "Reported at",
+}
+
+INCIDENT_PAGE_SIZE = 100
+
+# Shift label -> (start, end) local HH:MM window; a window whose end is
+# before its start runs past midnight.
+SHIFT_WINDOWS = {
+    "All shifts": None,
+    "Morning (06:00-14:00)": ("06:00", "14:00"),
+    "Evening (14:00-22:00)": ("14:00", "22:00"),
+    "Night (22:00-06:00)": ("22:00", "06:00"),
+}
+
+def window_conditions(start=None, end=None, agent_name=None, shift=None):
+    """WHERE terms and params for the created_at range, agent and shift filters.
+
+    `start`/`end` are epoch bounds (end exclusive) and use the created_at
+    indexes; `shift` is a SHIFT_WINDOWS value and is checked on the rows
+    inside that range.
+    """
+    conditions, params = [], []
+    if start is not None:
+        conditions.append("created_at >= ?")
+        params.append(start)
+    if end is not None:
+        conditions.append("created_at < ?")
+        params.append(end)
+    if agent_name:
+        conditions.append("agent_name = ?")
+        params.append(agent_name)
+    if shift:
+        clock = "strftime('%H:%M', created_at, 'unixepoch', 'localtime')"
+        joiner = "AND" if shift[0] < shift[1] else "OR"
+        conditions.append(f"({clock} >= ? {joiner} {clock} < ?)")
+        params.extend(shift)
+    return conditions, params
+
+def _read_incident_page(table, columns, agent_name, start, end, shift, before, limit):
+    """One keyset page of `table` as (frame, next_before), newest first."""
+    conditions, params = window_conditions(start, end, agent_name, shift)
+    if before is not None:
+        conditions.append("(created_at, id) < (?, ?)")
+        params.extend(before)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    # One extra row tells us whether another page exists.
+    frame = read_frame(f"""
+        SELECT {columns}, created_at AS page_created_at, id AS page_id
+        FROM {table} {where}
+        ORDER BY created_at DESC, id DESC
+        LIMIT ?
+    """, (*params, limit + 1))
+    next_before = None
+    if len(frame) > limit:
+        frame = frame.iloc[:limit]
+        next_before = (int(frame["page_created_at"].iloc[-1]), int(frame["page_id"].iloc[-1]))
+    return frame.drop(columns=["page_created_at", "page_id"]), next_before
+
+@cached_read("_logins")
+def get_late_logins_frame(agent_name=None, start=None, end=None, shift=None, before=None,
+                          limit=INCIDENT_PAGE_SIZE):
+    return _read_incident_page("_logins", "agent_name, presence_time, login_time, reason, timestamp",
+                               agent_name, start, end, shift, before, limit)
+
+@cached_read("quality_issues")
+def get_quality_issues_frame(agent_name=None, start=None, end=None, shift=None, before=None,
+                             limit=INCIDENT_PAGE_SIZE):
+    return _read_incident_page("quality_issues", "agent_name, issue_type, timing, mobile_number, product, timestamp",
+                               agent_name, start, end, shift, before, limit)
+
+@cached_read("midshift_issues")
+def get_midshift_issues_frame(agent_name=None, start=None, end=None, shift=None, before=None,
+                              limit=INCIDENT_PAGE_SIZE):
+    return _read_incident_page("midshift_issues", "agent_name, issue_type, start_time, end_time, timestamp",
+                               agent_name, start, end, shift, before, limit)
+
+@cached_read("mistakes")
+def get_mistakes_page(start=None, end=None, shift=None, before=None, limit=INCIDENT_PAGE_SIZE):
+    """Return (rows, next_before) for one keyset page of mistakes in the window."""
+    conditions, params = window_conditions(start, end, shift=shift)
+    if before is not None:
+        conditions.append("(created_at, id) < (?, ?)")
+        params.extend(before)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM midshift_issues ORDER BY timestamp DESC")
-        return cursor.fetchall()
-    finally:
-        conn.close()
+        cursor.execute(f"""
+            SELECT id, team_leader, agent_name, ticket_id, error_description, timestamp, created_at
+            FROM mistakes {where}
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?
+        """, (*params, limit + 1))
+        rows = cursor.fetchall()
+    page = [row[:-1] for row in rows[:limit]]
+    next_before = (rows[limit - 1][-1], rows[limit - 1][0]) if len(rows) > limit else None
+    return page, next_before
+
+EXPORT_CHUNK_ROWS = 5000
+EXPORT_DIR = "data/exports"
+# Prepared exports older than this are deleted when the next one is built.
+EXPORT_MAX_AGE = timedelta(hours=1)
+
+# Export kind -> (table, column labels) for the streaming CSV export.
+EXPORT_TABLES = {
+    "late_logins": ("_logins", LATE_LOGIN_LABELS),
+    "quality_issues": ("quality_issues", QUALITY_ISSUE_LABELS),
+    "midshift_issues": ("midshift_issues", MIDSHIFT_ISSUE_LABELS),
+}
+
+def purge_old_exports():
+    """Delete prepared exports in EXPORT_DIR older than EXPORT_MAX_AGE."""
+    cutoff = (datetime.now() - EXPORT_MAX_AGE).timestamp()
+    with os.scandir(EXPORT_DIR) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                # Another session removed it first.
+                pass
+
+def export_issues_csv(kind, start=None, end=None, agent_name=None):
+    """Stream an issue table into a CSV file under EXPORT_DIR and return its path.
+
+    `start`/`end` are epoch bounds on created_at (end exclusive). Rows are
+    fetched and written EXPORT_CHUNK_ROWS at a time, so memory use does not
+    grow with the size of the table. Files left by earlier exports are
+    removed once they pass EXPORT_MAX_AGE.
+    """
+    table, labels = EXPORT_TABLES[kind]
+    conditions, params = window_conditions(start, end, agent_name)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    purge_old_exports()
+    fd, path = tempfile.mkstemp(prefix=f"{kind}_", suffix=".csv", dir=EXPORT_DIR)
+    try:
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as f, get_db_connection() as conn:
+            writer = csv.writer(f)
+            writer.writerow(labels.values())
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT {', '.join(labels)} FROM {table} {where}
+                ORDER BY created_at DESC, id DESC
+            """, params)
+            while True:
+                rows = cursor.fetchmany(EXPORT_CHUNK_ROWS)
+                if not rows:
+                    break
+                writer.writerows(rows)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
 
 def clear_late_logins():
     if is_killswitch_enabled():
         st.error("System is currently locked. Please contact the developer.")
         return False
         
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("DELETE FROM late_logins")
+        cursor.execute("DELETE FROM _logins")
         conn.commit()
+        bump_data_version("_logins")
         return True
-    finally:
-        conn.close()
 
 def clear_quality_issues():
     if is_killswitch_enabled():
         st.error("System is currently locked. Please contact the developer.")
         return False
         
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("DELETE FROM quality_issues")
         conn.commit()
+        bump_data_version("quality_issues")
         return True
-    finally:
-        conn.close()
 
 def clear_midshift_issues():
     if is_killswitch_enabled():
         st.error("System is currently locked. Please contact the developer.")
         return False
         
-    conn = get_db_connection()
-    try:
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("DELETE FROM midshift_issues")
         conn.commit()
+        bump_data_version("midshift_issues")
         return True
-    finally:
-        conn.close()
+
+# --------------------------
+# Analytics Snapshot Export
+# --------------------------
+
+SNAPSHOT_DIR = "data/snapshots"
+SNAPSHOT_BATCH_ROWS = 50000
+
+# Columns exported per table. Password hashes and HOLD image bytes are
+# deliberately left out.
+SNAPSHOT_TABLES = {
+    "users": ("id", "username", "role"),
+    "requests": ("id", "agent_name", "request_type", "identifier", "comment", "timestamp", "created_at", "completed"),
+    "request_comments": ("id", "request_id", "user", "comment", "timestamp", "created_at"),
+    "mistakes": ("id", "team_leader", "agent_name", "ticket_id", "error_description", "timestamp", "created_at"),
+    "group_messages": ("id", "sender", "message", "mentions", "timestamp", "created_at"),
+    "hold_images": ("id", "uploader", "timestamp", "created_at"),
+    "breaks": ("id", "break_name", "start_time", "end_time", "max_users", "created_by", "timestamp", "created_at", "slot_date"),
+    "break_templates": ("id", "template_name", "weekday", "break_name", "start_time", "end_time", "max_users",
+                        "created_by", "timestamp", "created_at"),
+    "break_bookings": ("id", "break_id", "user_id", "username", "booking_date", "timestamp", "created_at"),
+    "_logins": ("id", "agent_name", "presence_time", "login_time", "reason", "timestamp", "created_at"),
+    "quality_issues": ("id", "agent_name", "issue_type", "timing", "mobile_number", "product", "timestamp", "created_at"),
+    "midshift_issues": ("id", "agent_name", "issue_type", "start_time", "end_time", "timestamp", "created_at"),
+    "request_daily_stats": ("day", "request_type", "total", "completed"),
+}
+
+# Bookkeeping tables a snapshot skips; the full-text indexes and SQLite's
+# own tables are skipped by name pattern. Any other table a migration adds
+# must be listed in SNAPSHOT_TABLES or the export refuses to run.
+SNAPSHOT_INTERNAL_TABLES = ("schema_version", "system_settings", "counters", "change_log")
+
+def _unsnapshotted_tables(cursor):
+    """User tables in the database that SNAPSHOT_TABLES does not cover."""
+    cursor.execute(f"""
+        SELECT name FROM sqlite_master
+        WHERE type = 'table' AND name NOT GLOB 'sqlite_*'
+          AND name NOT GLOB '*_fts' AND name NOT GLOB '*_fts_*'
+          AND name NOT IN ({', '.join('?' * len(SNAPSHOT_INTERNAL_TABLES))})
+    """, SNAPSHOT_INTERNAL_TABLES)
+    return sorted(name for (name,) in cursor.fetchall() if name not in SNAPSHOT_TABLES)
+
+def _snapshot_schema(cursor, table, columns):
+    """Arrow schema for `columns` of `table`, from the declared SQLite types."""
+    import pyarrow as pa
+    cursor.execute(f"PRAGMA table_info({table})")
+    declared = {column[1]: (column[2] or "").upper() for column in cursor.fetchall()}
+    fields = []
+    for column in columns:
+        if "INT" in declared[column]:
+            fields.append(pa.field(column, pa.int64()))
+        elif "BLOB" in declared[column]:
+            fields.append(pa.field(column, pa.binary()))
+        else:
+            fields.append(pa.field(column, pa.string()))
+    return pa.schema(fields)
+
+def export_analytics_snapshot():
+    """Write every table to compressed columnar files plus a manifest.json.
+
+    Uses Parquet (zstd) when pyarrow.parquet is available and Arrow IPC
+    (zstd) otherwise. All tables are read inside one read transaction, so
+    the snapshot is consistent, and streamed in SNAPSHOT_BATCH_ROWS chunks,
+    so memory stays flat however large the tables are. Returns the manifest.
+    """
+    import pyarrow as pa
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        pq = None
+    
+    created = datetime.now()
+    out_dir = os.path.join(SNAPSHOT_DIR, created.strftime("%Y%m%d-%H%M%S"))
+    file_format = "parquet" if pq is not None else "arrow"
+    manifest = {
+        "created": created.strftime("%Y-%m-%d %H:%M:%S"),
+        "format": file_format,
+        "compression": "zstd",
+        "tables": {},
+    }
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+        missing = _unsnapshotted_tables(cursor)
+        if missing:
+            raise RuntimeError(f"SNAPSHOT_TABLES does not cover: {', '.join(missing)}")
+        os.makedirs(out_dir, exist_ok=True)
+        cursor.execute("SELECT IFNULL(MAX(version), 0) FROM schema_version")
+        manifest["schema_version"] = cursor.fetchone()[0]
+        for table, columns in SNAPSHOT_TABLES.items():
+            schema = _snapshot_schema(cursor, table, columns)
+            file_name = f"{table.lstrip('_')}.{file_format}"
+            path = os.path.join(out_dir, file_name)
+            if pq is not None:
+                writer = pq.ParquetWriter(path, schema, compression="zstd")
+            else:
+                writer = pa.ipc.new_file(path, schema, options=pa.ipc.IpcWriteOptions(compression="zstd"))
+            rows = 0
+            try:
+                cursor.execute(f"SELECT {', '.join(columns)} FROM {table}")
+                while True:
+                    batch = cursor.fetchmany(SNAPSHOT_BATCH_ROWS)
+                    if not batch:
+                        break
+                    values = dict(zip(columns, zip(*batch)))
+                    writer.write_table(pa.Table.from_pydict(
+                        {column: list(values[column]) for column in columns}, schema=schema))
+                    rows += len(batch)
+            finally:
+                writer.close()
+            manifest["tables"][table] = {
+                "file": file_name,
+                "rows": rows,
+                "columns": {field.name: str(field.type) for field in schema},
+            }
+    
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    manifest["path"] = out_dir
+    return manifest
+
+# --------------------------
+# Dashboard Aggregations
+# --------------------------
+
+# Label -> number of days back from today; None means all time.
+DASHBOARD_PERIODS = {
+    "Last 7 days": 7,
+    "Last 30 days": 30,
+    "Last 90 days": 90,
+    "All time": None,
+}
+
+def day_start_epoch(days_back):
+    """Epoch of local midnight `days_back - 1` days ago, or 0 for all time."""
+    if days_back is None:
+        return 0
+    start = datetime.now().date() - timedelta(days=days_back - 1)
+    return int(datetime.combine(start, time.min).timestamp())
+
+# Period label for the incident views; "Custom range" uses the date picker.
+INCIDENT_PERIODS = ("Today", "Yesterday", "This week", "Last 7 days", "This month", "Custom range", "All time")
+
+def period_bounds(period, custom_range=()):
+    """(start, end) epoch bounds for an INCIDENT_PERIODS label; end is exclusive."""
+    today = datetime.now().date()
+    if period == "Today":
+        first, last = today, today
+    elif period == "Yesterday":
+        first = last = today - timedelta(days=1)
+    elif period == "This week":
+        first, last = today - timedelta(days=today.weekday()), today
+    elif period == "Last 7 days":
+        first, last = today - timedelta(days=6), today
+    elif period == "This month":
+        first, last = today.replace(day=1), today
+    elif period == "Custom range" and custom_range:
+        first, last = custom_range[0], custom_range[-1]
+    else:
+        return None, None
+    start = int(datetime.combine(first, time.min).timestamp())
+    end = int(datetime.combine(last + timedelta(days=1), time.min).timestamp())
+    return start, end
+
+# All three read the request_daily_stats rollup, so their cost follows the
+# number of days and types in the period, not the number of requests.
+
+@cached_read("requests")
+def get_request_totals(since=0):
+    """(total, completed) for requests created on or after the day of `since`."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT IFNULL(SUM(total), 0), IFNULL(SUM(completed), 0)
+            FROM request_daily_stats WHERE day >= date(?, 'unixepoch', 'localtime')
+        """, (since,))
+        return cursor.fetchone()
+
+@cached_read("requests")
+def get_request_daily_counts(since=0):
+    """One row per local day: Date, Total, Completed."""
+    return read_frame("""
+        SELECT day AS Date, SUM(total) AS Total, SUM(completed) AS Completed
+        FROM request_daily_stats WHERE day >= date(?, 'unixepoch', 'localtime')
+        GROUP BY day ORDER BY day
+    """, (since,))
+
+@cached_read("requests")
+def get_request_type_counts(since=0):
+    """One row per request type: Type, Total, Completed."""
+    return read_frame("""
+        SELECT request_type AS Type, SUM(total) AS Total, SUM(completed) AS Completed
+        FROM request_daily_stats WHERE day >= date(?, 'unixepoch', 'localtime')
+        GROUP BY request_type ORDER BY SUM(total) DESC
+    """, (since,))
+
+# --------------------------
+# Downtime Analytics
+# --------------------------
+
+MINUTES_PER_DAY = 24 * 60
+
+# Breakdown label -> grouping column of the downtime frame.
+DOWNTIME_GROUPS = {
+    "Agent": "agent_name",
+    "Issue Type": "issue_type",
+    "Day": "day",
+}
+
+def clock_minutes(values):
+    """Minutes past midnight for a Series of HH:MM strings; NaN where unparseable."""
+    clock = pd.to_datetime(values, format="%H:%M", errors="coerce")
+    return clock.dt.hour * 60 + clock.dt.minute
+
+@cached_read("midshift_issues")
+def get_midshift_downtime(start=None, end=None, shift=None):
+    """Minutes lost to mid-shift issues in the window, summarised per DOWNTIME_GROUPS.
+
+    Returns {label: frame} where each frame has the group column plus
+    Issues, Total Minutes and Average Minutes. Durations are computed
+    column-wise; an end time before the start time is taken to run past
+    midnight.
+    """
+    conditions, params = window_conditions(start, end, shift=shift)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    issues = read_frame(f"""
+        SELECT agent_name, issue_type, start_time, end_time,
+               date(created_at, 'unixepoch', 'localtime') AS day
+        FROM midshift_issues {where}
+    """, params)
+    issues["minutes"] = (clock_minutes(issues["end_time"]) - clock_minutes(issues["start_time"])) % MINUTES_PER_DAY
+    issues = issues.dropna(subset=["minutes"])
+
+    summaries = {}
+    for label, column in DOWNTIME_GROUPS.items():
+        summary = (
+            issues.groupby(column, observed=True)["minutes"]
+            .agg(["count", "sum", "mean"])
+            .reset_index()
+            .rename(columns={column: label, "count": "Issues", "sum": "Total Minutes", "mean": "Average Minutes"})
+        )
+        summary["Average Minutes"] = summary["Average Minutes"].round(1)
+        sort_by = "Day" if label == "Day" else "Total Minutes"
+        summaries[label] = summary.sort_values(sort_by, ascending=label == "Day", ignore_index=True)
+    return summaries
+
+# --------------------------
+# Break Occupancy Timeline
+# --------------------------
+
+def break_occupancy_timeline(bookings, date):
+    """Agents on break at each minute of `date`, from get_all_bookings() rows.
+
+    Each booking adds +1 at its start minute and -1 at its end minute in a
+    1,441-entry difference array, and a cumulative sum turns that into
+    the per-minute count. A break ending before it starts wraps past
+    midnight and is split into its evening and morning parts.
+    """
+    times = pd.DataFrame([(row[7], row[8]) for row in bookings], columns=["start", "end"])
+    starts = clock_minutes(times["start"])
+    ends = clock_minutes(times["end"])
+    valid = starts.notna() & ends.notna()
+    starts = starts[valid].astype(int).to_numpy()
+    ends = ends[valid].astype(int).to_numpy()
+    wraps = ends < starts
+
+    diff = np.bincount(starts, minlength=MINUTES_PER_DAY + 1) - np.bincount(ends, minlength=MINUTES_PER_DAY + 1)
+    diff[0] += wraps.sum()
+    diff[MINUTES_PER_DAY] -= wraps.sum()
+    on_break = np.cumsum(diff[:MINUTES_PER_DAY])
+
+    minutes = pd.date_range(pd.Timestamp(date), periods=MINUTES_PER_DAY, freq="min")
+    return pd.DataFrame({"On Break": on_break}, index=minutes)
+
+# --------------------------
+# Agent Scorecard
+# --------------------------
+
+# Scorecard column -> incident table counted per agent.
+SCORECARD_SOURCES = {
+    "Mistakes": "mistakes",
+    "Late Logins": "_logins",
+    "Quality Issues": "quality_issues",
+    "Mid-shift Issues": "midshift_issues",
+}
+
+@cached_read(*SCORECARD_SOURCES.values())
+def get_agent_scorecard(start=None, end=None):
+    """One row per agent with incident counts in [start, end) and the trend.
+
+    Each table is grouped once over its (agent_name, created_at) index.
+    With a bounded window the same scan also counts the preceding window
+    of equal length, giving Previous and Change columns; for all time only
+    the counts are returned.
+    """
+    has_trend = start is not None and end is not None
+    previous_start = start - (end - start) if has_trend else None
+    scan_start = previous_start if has_trend else start
+    conditions, params = window_conditions(scan_start, end)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    current = "SUM(created_at >= ?)" if has_trend else "COUNT(*)"
+    current_params = [start] if has_trend else []
+
+    selects = []
+    for label, table in SCORECARD_SOURCES.items():
+        selects.append(f"""
+            SELECT ? AS source, agent_name, {current} AS current, COUNT(*) AS scanned
+            FROM {table} {where} GROUP BY agent_name
+        """)
+    counts = read_frame(
+        " UNION ALL ".join(selects),
+        [p for label in SCORECARD_SOURCES for p in (label, *current_params, *params)],
+    )
+
+    columns = list(SCORECARD_SOURCES)
+    scorecard = (
+        counts.pivot_table(index="agent_name", columns="source", values="current",
+                           aggfunc="sum", fill_value=0, observed=True)
+        .reindex(columns=columns, fill_value=0)
+        .astype(int)
+    )
+    scorecard["Total"] = scorecard[columns].sum(axis=1)
+    if has_trend:
+        scanned = counts.groupby("agent_name", observed=True)["scanned"].sum()
+        scorecard["Previous"] = (scanned.reindex(scorecard.index, fill_value=0) - scorecard["Total"]).astype(int)
+        scorecard["Change"] = scorecard["Total"] - scorecard["Previous"]
+    scorecard = scorecard.rename_axis(index="Agent", columns=None).reset_index()
+    return scorecard.sort_values(["Total", "Agent"], ascending=[False, True], ignore_index=True)
 
 # --------------------------
 # Fancy Number Checker Functions
@@ -1002,10 +2271,11 @@ if "authenticated" not in st.session_state:
         "role": None,
         "username": None,
         "current_section": "requests",
-        "last_request_count": 0,
-        "last_mistake_count": 0,
-        "last_message_ids": [],
-        "break_edits": {}
+        "last_change_id": None,
+        "unread_messages": 0,
+        "request_pages": 1,
+        "break_edits": {},
+        "break_loaded": {}
     })
 
 init_db()
@@ -1025,9 +2295,8 @@ if not st.session_state.authenticated:
                             "authenticated": True,
                             "role": role,
                             "username": username,
-                            "last_request_count": len(get_requests()),
-                            "last_mistake_count": len(get_mistakes()),
-                            "last_message_ids": [msg[0] for msg in get_group_messages()]
+                            "last_change_id": get_change_feed_position(),
+                            "unread_messages": 0
                         })
                         st.rerun()
                     else:
@@ -1049,34 +2318,98 @@ else:
         </div>
         """, unsafe_allow_html=True)
 
+    counters = get_counters()
+
     def show_notifications():
-        current_requests = get_requests()
-        current_mistakes = get_mistakes()
-        current_messages = get_group_messages()
+        if st.session_state.get("last_change_id") is None:
+            st.session_state.last_change_id = get_change_feed_position()
+            st.session_state.unread_messages = 0
+            return
+        
+        # Only rows written since this session's high-water mark are read.
+        position, changes = get_changes_since(st.session_state.last_change_id)
+        st.session_state.last_change_id = position
         
-        new_requests = len(current_requests) - st.session_state.last_request_count
-        if new_requests > 0 and st.session_state.last_request_count > 0:
+        new_requests = len(changes["requests"]["insert"])
+        if new_requests > 0:
             st.toast(f"📋 {new_requests} new request(s) submitted!")
-        st.session_state.last_request_count = len(current_requests)
         
-        new_mistakes = len(current_mistakes) - st.session_state.last_mistake_count
-        if new_mistakes > 0 and st.session_state.last_mistake_count > 0:
+        new_mistakes = len(changes["mistakes"]["insert"])
+        if new_mistakes > 0:
             st.toast(f"❌ {new_mistakes} new mistake(s) reported!")
-        st.session_state.last_mistake_count = len(current_mistakes)
         
-        current_message_ids = [msg[0] for msg in current_messages]
-        new_messages = [msg for msg in current_messages if msg[0] not in st.session_state.last_message_ids]
-        for msg in new_messages:
+        for msg in changes["group_messages"]["insert"]:
             if msg[1] != st.session_state.username:
+                st.session_state.unread_messages += 1
                 mentions = msg[4].split(',') if msg[4] else []
                 if st.session_state.username in mentions:
                     st.toast(f"💬 You were mentioned by {msg[1]}!")
                 else:
                     st.toast(f"💬 New message from {msg[1]}!")
-        st.session_state.last_message_ids = current_message_ids
 
     show_notifications()
 
+    def show_csv_export(kind, file_name):
+        """Filter form for an issue CSV export; the file is only built when asked for."""
+        export_key = f"{kind}_export_path"
+        with st.expander("⬇️ Export as CSV"):
+            with st.form(f"{kind}_export_form"):
+                cols = st.columns(2)
+                date_range = cols[0].date_input("Date range (optional)", value=(), key=f"{kind}_export_dates")
+                agent_filter = cols[1].text_input("Agent (optional)", key=f"{kind}_export_agent")
+                if st.form_submit_button("Prepare Export"):
+                    start = end = None
+                    if date_range:
+                        start = int(datetime.combine(date_range[0], time.min).timestamp())
+                        end = int(datetime.combine(date_range[-1] + timedelta(days=1), time.min).timestamp())
+                    old_path = st.session_state.get(export_key)
+                    if old_path and os.path.exists(old_path):
+                        os.remove(old_path)
+                    st.session_state[export_key] = export_issues_csv(kind, start, end, agent_filter.strip() or None)
+            
+            path = st.session_state.get(export_key)
+            if path and os.path.exists(path):
+                # A callable defers reading the file until Download is
+                # clicked, instead of loading it on every rerun.
+                st.download_button(
+                    label="Download as CSV",
+                    data=lambda: open(path, "rb"),
+                    file_name=file_name,
+                    mime="text/csv",
+                    key=f"{kind}_download"
+                )
+
+    def show_period_filter(key):
+        """Period and shift pickers for an incident view; returns the reader filters."""
+        cols = st.columns(3)
+        period = cols[0].selectbox("Period", INCIDENT_PERIODS, key=f"{key}_period")
+        custom_range = ()
+        if period == "Custom range":
+            custom_range = cols[1].date_input("Dates", value=(), key=f"{key}_dates")
+        shift_label = cols[2].selectbox("Shift", list(SHIFT_WINDOWS), key=f"{key}_shift")
+        start, end = period_bounds(period, custom_range)
+        filters = {"start": start, "end": end, "shift": SHIFT_WINDOWS[shift_label]}
+        # A new filter starts again from the first page.
+        if st.session_state.get(f"{key}_filters") != filters:
+            st.session_state[f"{key}_filters"] = filters
+            st.session_state[f"{key}_pages"] = 1
+        return filters
+
+    def load_incident_pages(key, reader, **filters):
+        """Concatenate the keyset pages shown so far; returns (frame, has_more)."""
+        frames, page_cursor = [], None
+        for _ in range(st.session_state.get(f"{key}_pages", 1)):
+            frame, page_cursor = reader(before=page_cursor, **filters)
+            frames.append(frame)
+            if page_cursor is None:
+                break
+        return pd.concat(frames, ignore_index=True), page_cursor is not None
+
+    def show_load_more(key):
+        if st.button("⬇️ Load more", key=f"{key}_load_more"):
+            st.session_state[f"{key}_pages"] = st.session_state.get(f"{key}_pages", 1) + 1
+            st.rerun()
+
     with st.sidebar:
         st.title(f"👋 Welcome, {st.session_state.username}")
         st.markdown("---")
@@ -1094,6 +2427,7 @@ else:
             ("🔄 Mid-shift Issues", "midshift_issues")
         ]
         if st.session_state.role == "admin":
+            nav_options.append(("📇 Scorecard", "scorecard"))
             nav_options.append(("⚙️ Admin", "admin"))
         
         for option, value in nav_options:
@@ -1101,11 +2435,11 @@ else:
                 st.session_state.current_section = value
                 
         st.markdown("---")
-        pending_requests = len([r for r in get_requests() if not r[6]])
-        new_mistakes = len(get_mistakes())
-        unread_messages = len([m for m in get_group_messages() 
-                             if m[0] not in st.session_state.last_message_ids 
-                             and m[1] != st.session_state.username])
+        pending_requests = counters.get("requests_pending", 0)
+        new_mistakes = counters.get("mistakes", 0)
+        if st.session_state.current_section == "chat":
+            st.session_state.unread_messages = 0
+        unread_messages = st.session_state.unread_messages
         
         st.markdown(f"""
         <div style="margin-bottom: 20px;">
@@ -1123,7 +2457,8 @@ else:
     st.title(st.session_state.current_section.title())
 
     if st.session_state.current_section == "requests":
-        if not is_killswitch_enabled():
+        system_locked = is_killswitch_enabled()
+        if not system_locked:
             with st.expander("➕ Submit New Request"):
                 with st.form("request_form"):
                     cols = st.columns([1, 3])
@@ -1138,15 +2473,32 @@ else:
         
         st.subheader("🔍 Search Requests")
         search_query = st.text_input("Search requests...")
-        requests = search_requests(search_query) if search_query else get_requests()
+        if "request_pages" not in st.session_state:
+            st.session_state.request_pages = 1
+        
+        has_more_requests = False
+        if search_query:
+            requests = search_requests(search_query)
+        else:
+            # Walk the keyset pages the user has asked for; each page is an
+            # index seek, so cost follows pages shown rather than history.
+            requests = []
+            page_cursor = None
+            for _ in range(st.session_state.request_pages):
+                page, page_cursor = get_requests_page(before=page_cursor, limit=REQUESTS_PAGE_SIZE)
+                requests.extend(page)
+                if page_cursor is None:
+                    break
+            has_more_requests = page_cursor is not None
         
         st.subheader("All Requests")
+        comments_by_request = get_comments_for_requests([req[0] for req in requests])
         for req in requests:
             req_id, agent, req_type, identifier, comment, timestamp, completed = req
             with st.container():
                 cols = st.columns([0.1, 0.9])
                 with cols[0]:
-                    if not is_killswitch_enabled():
+                    if not system_locked:
                         st.checkbox("Done", value=bool(completed), 
                                    key=f"check_{req_id}", 
                                    on_change=update_request_status,
@@ -1166,7 +2518,7 @@ else:
                             <h5>Status Updates:</h5>
                     """, unsafe_allow_html=True)
                     
-                    comments = get_request_comments(req_id)
+                    comments = comments_by_request[req_id]
                     for comment in comments:
                         cmt_id, _, user, cmt_text, cmt_time = comment
                         st.markdown(f"""
@@ -1181,7 +2533,7 @@ else:
                     
                     st.markdown("</div>", unsafe_allow_html=True)
                     
-                    if st.session_state.role == "admin" and not is_killswitch_enabled():
+                    if st.session_state.role == "admin" and not system_locked:
                         with st.form(key=f"comment_form_{req_id}"):
                             new_comment = st.text_input("Add status update/comment")
                             if st.form_submit_button("Add Comment"):
@@ -1189,11 +2541,16 @@ else:
                                     add_request_comment(req_id, st.session_state.username, new_comment)
                                     st.rerun()
 
+        if has_more_requests:
+            if st.button("⬇️ Load more", key="load_more_requests"):
+                st.session_state.request_pages += 1
+                st.rerun()
+
     elif st.session_state.current_section == "dashboard":
         st.subheader("📊 Request Completion Dashboard")
-        all_requests = get_requests()
-        total = len(all_requests)
-        completed = sum(1 for r in all_requests if r[6])
+        period = st.selectbox("Period", list(DASHBOARD_PERIODS), index=1)
+        since = day_start_epoch(DASHBOARD_PERIODS[period])
+        total, completed = get_request_totals(since)
         rate = (completed/total*100) if total > 0 else 0
         
         col1, col2, col3 = st.columns(3)
@@ -1203,24 +2560,18 @@ else:
             st.metric("Completed", completed)
         with col3:
             st.metric("Completion Rate", f"{rate:.1f}%")
-        if not df.empty:
-            st.dataframe(df)
+        
+        daily = get_request_daily_counts(since)
+        if not daily.empty:
+            st.subheader("Request Trends")
+            st.bar_chart(daily.set_index("Date")[["Total", "Completed"]])
+            
+            st.subheader("Request Type Distribution")
+            type_counts = get_request_type_counts(since)
+            st.bar_chart(type_counts.set_index("Type")["Total"])
+            st.dataframe(type_counts, hide_index=True)
         else:
             st.info("No data available")
-        
-        df = pd.DataFrame({
-            'Date': [datetime.strptime(r[5], "%Y-%m-%d %H:%M:%S").date() for r in all_requests],
-            'Status': ['Completed' if r[6] else 'Pending' for r in all_requests],
-            'Type': [r[2] for r in all_requests]
-        })
-        
-        st.subheader("Request Trends")
-        st.bar_chart(df['Date'].value_counts())
-        
-        st.subheader("Request Type Distribution")
-        type_counts = df['Type'].value_counts().reset_index()
-        type_counts.columns = ['Type', 'Count']
-        st.bar_chart(type_counts.set_index('Type'))
 
     elif st.session_state.current_section == "breaks":
         today = datetime.now().strftime("%Y-%m-%d")
@@ -1256,23 +2607,99 @@ else:
                             except ValueError:
                                 st.error("Invalid time format. Please use HH:MM format (e.g., 08:30)")
             
+            with st.expander("🗓️ Schedule Templates"):
+                with st.form("add_template_form"):
+                    cols = st.columns(2)
+                    template_name = cols[0].text_input("Template (e.g. Morning shift)")
+                    weekday = cols[1].selectbox("Day", ["Every day", *WEEKDAY_LABELS])
+                    cols = st.columns(4)
+                    break_name = cols[0].text_input("Break Name", key="template_break_name")
+                    start_time = cols[1].text_input("Start Time (HH:MM)", key="template_start")
+                    end_time = cols[2].text_input("End Time (HH:MM)", key="template_end")
+                    max_users = cols[3].number_input("Max Users", min_value=1, value=1, key="template_max")
+                    
+                    if st.form_submit_button("Add Template Slot"):
+                        if template_name and break_name:
+                            try:
+                                datetime.strptime(start_time, "%H:%M")
+                                datetime.strptime(end_time, "%H:%M")
+                                add_break_template(
+                                    template_name.strip(),
+                                    None if weekday == "Every day" else WEEKDAY_LABELS.index(weekday),
+                                    break_name,
+                                    start_time,
+                                    end_time,
+                                    max_users,
+                                    st.session_state.username
+                                )
+                                st.rerun()
+                            except ValueError:
+                                st.error("Invalid time format. Please use HH:MM format (e.g., 08:30)")
+                
+                templates = get_break_templates()
+                for t_id, t_name, t_weekday, t_break, t_start, t_end, t_max in templates:
+                    cols = st.columns([6, 1])
+                    day_label = "Every day" if t_weekday is None else WEEKDAY_LABELS[t_weekday]
+                    cols[0].write(f"*{t_name}* · {day_label} · {t_break} ({t_start} - {t_end}) · max {t_max}")
+                    if cols[1].button("❌", key=f"del_template_{t_id}"):
+                        delete_break_template(t_id)
+                        st.rerun()
+                
+                template_names = sorted({t[1] for t in templates})
+                if template_names:
+                    cols = st.columns(2)
+                    chosen_template = cols[0].selectbox("Generate from", template_names)
+                    span = cols[1].radio("For", ["Week of selected date", "Month of selected date"], horizontal=True)
+                    if span.startswith("Week"):
+                        first_date = selected_date - timedelta(days=selected_date.weekday())
+                        last_date = first_date + timedelta(days=6)
+                    else:
+                        first_date = selected_date.replace(day=1)
+                        last_date = (first_date + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+                    if st.button("Generate Slots"):
+                        generated = generate_break_slots(chosen_template, first_date, last_date, st.session_state.username)
+                        if generated is not False:
+                            created, skipped = generated
+                            st.success(f"Created {created} slots from {first_date} to {last_date}")
+                            if skipped:
+                                listed = "\n".join(f"- {date}: {name} ({start})" for date, name, start in skipped[:20])
+                                more = f"\n- ...and {len(skipped) - 20} more" if len(skipped) > 20 else ""
+                                st.warning(
+                                    f"Skipped {len(skipped)} slots whose name and start time were already taken "
+                                    f"on that date:\n\n{listed}{more}"
+                                )
+            
+            with st.expander("🧹 Purge Old Dates"):
+                purge_before = st.date_input("Delete dated slots and bookings before",
+                                             datetime.now().date() - timedelta(days=30), key="purge_before")
+                if st.button("Purge"):
+                    purged = purge_break_dates(purge_before.strftime("%Y-%m-%d"))
+                    if purged:
+                        st.success(f"Deleted {purged[0]} slots and {purged[1]} bookings")
+            
             st.subheader("Current Break Schedule")
-            breaks = get_all_break_slots()
+            breaks = get_break_slots(formatted_date)
             
             # Initialize break_edits if not exists
             if "break_edits" not in st.session_state:
                 st.session_state.break_edits = {}
+            if "break_loaded" not in st.session_state:
+                st.session_state.break_loaded = {}
             
-            # Store current edits
+            # Store current edits; break_loaded keeps the values each slot's
+            # widgets started from, so saving only writes what this admin
+            # changed and never reverts another admin's save.
             for b in breaks:
                 b_id, name, start, end, max_u, curr_u, created_by, ts = b
                 if b_id not in st.session_state.break_edits:
-                    st.session_state.break_edits[b_id] = {
+                    loaded = {
                         "break_name": name,
                         "start_time": start,
                         "end_time": end,
                         "max_users": max_u
                     }
+                    st.session_state.break_loaded[b_id] = loaded
+                    st.session_state.break_edits[b_id] = dict(loaded)
             
             # Display editable breaks
             for b in breaks:
@@ -1315,27 +2742,33 @@ else:
             
             # Single save button for all changes
             if st.button("💾 Save All Changes"):
+                # Only slots on this page whose widgets differ from the values
+                # they were loaded with are written, and nothing is written
+                # unless they all validate.
+                changed = {
+                    b[0]: st.session_state.break_edits[b[0]] for b in breaks
+                    if st.session_state.break_edits[b[0]] != st.session_state.break_loaded[b[0]]
+                }
                 errors = []
-                for b_id, edits in st.session_state.break_edits.items():
+                for b_id, edits in changed.items():
                     try:
                         # Validate time format
                         datetime.strptime(edits["start_time"], "%H:%M")
                         datetime.strptime(edits["end_time"], "%H:%M")
-                        update_break_slot(
-                            b_id,
-                            edits["break_name"],
-                            edits["start_time"],
-                            edits["end_time"],
-                            edits["max_users"]
-                        )
-                    except ValueError as e:
+                    except ValueError:
                         errors.append(f"Break ID {b_id}: Invalid time format. Please use HH:MM format.")
-                        continue
                 
                 if errors:
                     for error in errors:
                         st.error(error)
-                else:
+                elif not changed:
+                    st.info("No changes to save")
+                elif update_break_slots([
+                    (b_id, edits["break_name"], edits["start_time"], edits["end_time"], edits["max_users"])
+                    for b_id, edits in changed.items()
+                ]):
+                    for b_id, edits in changed.items():
+                        st.session_state.break_loaded[b_id] = dict(edits)
                     st.success("All changes saved successfully!")
                     st.rerun()
             
@@ -1344,9 +2777,24 @@ else:
             try:
                 bookings = get_all_bookings(formatted_date)
                 if bookings:
-                    for b in bookings:
-                        b_id, break_id, user_id, username, date, ts, break_name, start, end, role = b
-                        st.write(f"{username} ({role}) - {break_name} ({start} - {end})")
+                    timeline = break_occupancy_timeline(bookings, formatted_date)
+                    peak_at = timeline["On Break"].idxmax()
+                    cols = st.columns(3)
+                    cols[0].metric("Bookings", len(bookings))
+                    cols[1].metric("Peak On Break", int(timeline["On Break"].max()), help=f"First reached at {peak_at:%H:%M}")
+                    at_time = cols[2].time_input("On break at", time(12, 0), step=300, key="timeline_at")
+                    st.caption(f"On break at {at_time:%H:%M}: {int(timeline['On Break'].iloc[at_time.hour * 60 + at_time.minute])}")
+                    st.area_chart(timeline)
+                    
+                    with st.expander("Booking list"):
+                        st.dataframe(
+                            pd.DataFrame(
+                                [(username, role, break_name, start, end)
+                                 for _, _, _, username, _, _, break_name, start, end, role in bookings],
+                                columns=["Agent", "Role", "Break", "Start", "End"]
+                            ),
+                            hide_index=True
+                        )
                 else:
                     st.info("No bookings for selected date")
             except Exception as e:
@@ -1363,23 +2811,7 @@ else:
                 
                 if available_breaks:
                     for b in available_breaks:
-                        b_id, name, start, end, max_u, curr_u, created_by, ts = b
-                        
-                        try:
-                            conn = get_db_connection()
-                            cursor = conn.cursor()
-                            cursor.execute("""
-                                SELECT COUNT(*) 
-                                FROM break_bookings 
-                                WHERE break_id = ? AND booking_date = ?
-                            """, (b_id, formatted_date))
-                            booked_count = cursor.fetchone()[0]
-                            remaining = max_u - booked_count
-                        except Exception as e:
-                            st.error(f"Error checking availability: {str(e)}")
-                            continue
-                        finally:
-                            conn.close()
+                        b_id, name, start, end, max_u, curr_u, created_by, ts, remaining = b
                         
                         with st.container():
                             cols = st.columns([3, 2, 1])
@@ -1388,17 +2820,22 @@ else:
                             
                             if cols[2].button("Book", key=f"book_{b_id}"):
                                 try:
-                                    conn = get_db_connection()
-                                    cursor = conn.cursor()
-                                    cursor.execute("SELECT id FROM users WHERE username = ?", 
-                                                (st.session_state.username,))
-                                    user_id = cursor.fetchone()[0]
-                                    book_break_slot(b_id, user_id, st.session_state.username, formatted_date)
-                                    st.rerun()
+                                    with get_db_connection() as conn:
+                                        cursor = conn.cursor()
+                                        cursor.execute("SELECT id FROM users WHERE username = ?", 
+                                                    (st.session_state.username,))
+                                        user_id = cursor.fetchone()[0]
+                                    outcome = book_break_slot(b_id, user_id, st.session_state.username, formatted_date)
+                                    if outcome == BOOKING_FULL:
+                                        st.error(f"{name} is already full for this date")
+                                    elif outcome == BOOKING_DUPLICATE:
+                                        st.warning(f"You have already booked {name} for this date")
+                                    elif outcome == BOOKING_UNAVAILABLE:
+                                        st.error(f"{name} is no longer available for this date")
+                                    elif outcome:
+                                        st.rerun()
                                 except Exception as e:
                                     st.error(f"Error booking slot: {str(e)}")
-                                finally:
-                                    conn.close()
             except Exception as e:
                 st.error(f"Error loading break slots: {str(e)}")
             
@@ -1430,7 +2867,18 @@ else:
         
         st.subheader("🔍 Search Mistakes")
         search_query = st.text_input("Search mistakes...")
-        mistakes = search_mistakes(search_query) if search_query else get_mistakes()
+        has_more_mistakes = False
+        if search_query:
+            mistakes = search_mistakes(search_query)
+        else:
+            filters = show_period_filter("mistakes")
+            mistakes, page_cursor = [], None
+            for _ in range(st.session_state.mistakes_pages):
+                page, page_cursor = get_mistakes_page(before=page_cursor, **filters)
+                mistakes.extend(page)
+                if page_cursor is None:
+                    break
+            has_more_mistakes = page_cursor is not None
         
         st.subheader("Mistakes Log")
         for mistake in mistakes:
@@ -1446,6 +2894,9 @@ else:
                 <p>Error: {error}</p>
             </div>
             """, unsafe_allow_html=True)
+        
+        if has_more_mistakes:
+            show_load_more("mistakes")
 
     elif st.session_state.current_section == "chat":
         if is_chat_killswitch_enabled():
@@ -1483,7 +2934,7 @@ else:
         images = get_hold_images()
         if images:
             for img in images:
-                iid, uploader, data, ts = img
+                iid, uploader, ts = img
                 st.markdown(f"""
                 <div class="card">
                     <div style="display: flex; justify-content: space-between;">
@@ -1493,7 +2944,9 @@ else:
                     <p>Uploaded by: {uploader}</p>
                 </div>
                 """, unsafe_allow_html=True)
-                st.image(Image.open(io.BytesIO(data)), use_container_width=True)
+                data = get_hold_image_data(iid)
+                if data:
+                    st.image(Image.open(io.BytesIO(data)), use_container_width=True)
         else:
             st.info("No images in HOLD")
 
@@ -1618,51 +3071,27 @@ else:
                         st.error("Invalid time format. Please use HH:MM format (e.g., 08:30)")
         
         st.subheader("Late Login Records")
-        late_logins = get_late_logins()
-        
+        filters = show_period_filter("late_logins")
         if st.session_state.role == "admin":
-            if late_logins:
-                # Prepare data for download
-                data = []
-                for login in late_logins:
-                    _, agent, presence, login_time, reason, ts = login
-                    data.append({
-                        "Agent's Name": agent,
-                        "Time of presence": presence,
-                        "Time of log in": login_time,
-                        "Reason": reason
-                    })
-                
-                df = pd.DataFrame(data)
+            late_logins, has_more = load_incident_pages("late_logins", get_late_logins_frame, **filters)
+            if not late_logins.empty:
+                df = late_logins.rename(columns=LATE_LOGIN_LABELS)
                 st.dataframe(df)
+                if has_more:
+                    show_load_more("late_logins")
                 
-                # Download button
-                csv = df.to_csv(index=False).encode('utf-8')
-                st.download_button(
-                    label="Download as CSV",
-                    data=csv,
-                    file_name="late_logins.csv",
-                    mime="text/csv"
-                )
+                show_csv_export("late_logins", "late_logins.csv")
                 
             else:
                 st.info("No late login records found")
         else:
             # For agents, only show their own records
-            user_logins = [login for login in late_logins if login[1] == st.session_state.username]
-            if user_logins:
-                data = []
-                for login in user_logins:
-                    _, agent, presence, login_time, reason, ts = login
-                    data.append({
-                        "Agent's Name": agent,
-                        "Time of presence": presence,
-                        "Time of log in": login_time,
-                        "Reason": reason
-                    })
-                
-                df = pd.DataFrame(data)
-                st.dataframe(df)
+            user_logins, has_more = load_incident_pages("late_logins", get_late_logins_frame,
+                                                 agent_name=st.session_state.username, **filters)
+            if not user_logins.empty:
+                st.dataframe(user_logins.rename(columns=LATE_LOGIN_LABELS))
+                if has_more:
+                    show_load_more("late_logins")
             else:
                 st.info("You have no late login records")
 
@@ -1700,53 +3129,27 @@ else:
                         st.error("Invalid time format. Please use HH:MM format (e.g., 14:30)")
         
         st.subheader("Quality Issue Records")
-        quality_issues = get_quality_issues()
-        
+        filters = show_period_filter("quality_issues")
         if st.session_state.role == "admin":
-            if quality_issues:
-                # Prepare data for download
-                data = []
-                for issue in quality_issues:
-                    _, agent, issue_type, timing, mobile, product, ts = issue
-                    data.append({
-                        "Agent's Name": agent,
-                        "Type of issue": issue_type,
-                        "Timing": timing,
-                        "Mobile number": mobile,
-                        "Product": product
-                    })
-                
-                df = pd.DataFrame(data)
+            quality_issues, has_more = load_incident_pages("quality_issues", get_quality_issues_frame, **filters)
+            if not quality_issues.empty:
+                df = quality_issues.rename(columns=QUALITY_ISSUE_LABELS)
                 st.dataframe(df)
+                if has_more:
+                    show_load_more("quality_issues")
                 
-                # Download button
-                csv = df.to_csv(index=False).encode('utf-8')
-                st.download_button(
-                    label="Download as CSV",
-                    data=csv,
-                    file_name="quality_issues.csv",
-                    mime="text/csv"
-                )
+                show_csv_export("quality_issues", "quality_issues.csv")
                 
             else:
                 st.info("No quality issue records found")
         else:
             # For agents, only show their own records
-            user_issues = [issue for issue in quality_issues if issue[1] == st.session_state.username]
-            if user_issues:
-                data = []
-                for issue in user_issues:
-                    _, agent, issue_type, timing, mobile, product, ts = issue
-                    data.append({
-                        "Agent's Name": agent,
-                        "Type of issue": issue_type,
-                        "Timing": timing,
-                        "Mobile number": mobile,
-                        "Product": product
-                    })
-                
-                df = pd.DataFrame(data)
-                st.dataframe(df)
+            user_issues, has_more = load_incident_pages("quality_issues", get_quality_issues_frame,
+                                                 agent_name=st.session_state.username, **filters)
+            if not user_issues.empty:
+                st.dataframe(user_issues.rename(columns=QUALITY_ISSUE_LABELS))
+                if has_more:
+                    show_load_more("quality_issues")
             else:
                 st.info("You have no quality issue records")
 
@@ -1782,53 +3185,58 @@ else:
                         st.error("Invalid time format. Please use HH:MM format (e.g., 10:00)")
         
         st.subheader("Mid-shift Issue Records")
-        midshift_issues = get_midshift_issues()
-        
+        filters = show_period_filter("midshift_issues")
         if st.session_state.role == "admin":
-            if midshift_issues:
-                # Prepare data for download
-                data = []
-                for issue in midshift_issues:
-                    _, agent, issue_type, start_time, end_time, ts = issue
-                    data.append({
-                        "Agent's Name": agent,
-                        "Issue Type": issue_type,
-                        "Start time": start_time,
-                        "End Time": end_time
-                    })
-                
-                df = pd.DataFrame(data)
+            midshift_issues, has_more = load_incident_pages("midshift_issues", get_midshift_issues_frame, **filters)
+            if not midshift_issues.empty:
+                df = midshift_issues.rename(columns=MIDSHIFT_ISSUE_LABELS)
                 st.dataframe(df)
+                if has_more:
+                    show_load_more("midshift_issues")
                 
-                # Download button
-                csv = df.to_csv(index=False).encode('utf-8')
-                st.download_button(
-                    label="Download as CSV",
-                    data=csv,
-                    file_name="midshift_issues.csv",
-                    mime="text/csv"
-                )
+                show_csv_export("midshift_issues", "midshift_issues.csv")
+
+                st.subheader("⏱️ Downtime")
+                downtime = get_midshift_downtime(**filters)
+                breakdown = st.radio("Breakdown", list(DOWNTIME_GROUPS), horizontal=True, key="downtime_breakdown")
+                summary = downtime[breakdown]
+                cols = st.columns(2)
+                cols[0].metric("Minutes Lost", int(summary["Total Minutes"].sum()))
+                cols[1].metric("Issues", int(summary["Issues"].sum()))
+                if breakdown == "Day":
+                    st.bar_chart(summary.set_index("Day")["Total Minutes"])
+                st.dataframe(summary, hide_index=True)
+
             else:
                 st.info("No mid-shift issue records found")
         else:
             # For agents, only show their own records
-            user_issues = [issue for issue in midshift_issues if issue[1] == st.session_state.username]
-            if user_issues:
-                data = []
-                for issue in user_issues:
-                    _, agent, issue_type, start_time, end_time, ts = issue
-                    data.append({
-                        "Agent's Name": agent,
-                        "Issue Type": issue_type,
-                        "Start time": start_time,
-                        "End Time": end_time
-                    })
-                
-                df = pd.DataFrame(data)
-                st.dataframe(df)
+            user_issues, has_more = load_incident_pages("midshift_issues", get_midshift_issues_frame,
+                                                 agent_name=st.session_state.username, **filters)
+            if not user_issues.empty:
+                st.dataframe(user_issues.rename(columns=MIDSHIFT_ISSUE_LABELS))
+                if has_more:
+                    show_load_more("midshift_issues")
             else:
                 st.info("You have no mid-shift issue records")
 
+    elif st.session_state.current_section == "scorecard" and st.session_state.role == "admin":
+        cols = st.columns(3)
+        period = cols[0].selectbox("Period", INCIDENT_PERIODS, index=INCIDENT_PERIODS.index("This month"),
+                                   key="scorecard_period")
+        custom_range = ()
+        if period == "Custom range":
+            custom_range = cols[1].date_input("Dates", value=(), key="scorecard_dates")
+        start, end = period_bounds(period, custom_range)
+
+        scorecard = get_agent_scorecard(start, end)
+        if scorecard.empty:
+            st.info("No incidents recorded in this period")
+        else:
+            if "Previous" in scorecard.columns:
+                st.caption("Previous and Change compare against the period of the same length just before.")
+            st.dataframe(scorecard, hide_index=True, use_container_width=True)
+
     elif st.session_state.current_section == "admin" and st.session_state.role == "admin":
         if st.session_state.username.lower() == "taha kirri":
             st.subheader("🚨 System Killswitch")
@@ -1931,6 +3339,13 @@ else:
                         st.success("All mid-shift issue records deleted!")
                         st.rerun()
 
+        with st.expander("🔁 Rebuild Statistics"):
+            with st.form("rebuild_stats_form"):
+                st.info("Recomputes notification counters and the daily request statistics from the raw tables.")
+                if st.form_submit_button("Rebuild Statistics"):
+                    if rebuild_statistics():
+                        st.success("Statistics rebuilt!")
+
         with st.expander("💣 Clear ALL Data"):
             with st.form("nuclear_form"):
                 st.error("THIS WILL DELETE EVERYTHING IN THE SYSTEM!")
@@ -1949,6 +3364,20 @@ else:
                     except Exception as e:
                         st.error(f"Error during deletion: {str(e)}")
         
+        st.markdown("---")
+        st.subheader("📦 Analytics Snapshot")
+        st.caption("Exports every table to compressed columnar files for the reporting team.")
+        if st.button("Create Snapshot", key="create_snapshot"):
+            try:
+                manifest = export_analytics_snapshot()
+                st.success(f"Snapshot written to {manifest['path']}")
+                st.dataframe(pd.DataFrame(
+                    [(table, info["file"], info["rows"]) for table, info in manifest["tables"].items()],
+                    columns=["Table", "File", "Rows"]
+                ), hide_index=True)
+            except Exception as e:
+                st.error(f"Error creating snapshot: {str(e)}")
+        
         st.markdown("---")
         st.subheader("User Management")
         if not is_killswitch_enabled():